@@ -0,0 +1,255 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+MARKETPLACE_HOST = 'marketplace.visualstudio.com'
+CDN_HOST = 'cdn.fake'
+GITHUB_HOST = 'api.github.com'
+
+GRAPHQL_ALIAS = re.compile(r'(r\d+): repository\(owner: "([^"]+)", name: "([^"]+)"\)')
+EXTENSION_NAME = re.compile(r'pub(\d+)\.ext(\d+)', re.IGNORECASE)
+
+def synthetic_extension(index):
+    """
+    Marketplace `extensionquery` entry for synthetic extension number `index`.
+    """
+    publisher, name = f"pub{index}", f"ext{index}"
+    return {
+        'extensionId': f"00000000-0000-0000-0000-{index:012d}",
+        'extensionName': name,
+        'displayName': f"Extension {index}",
+        'shortDescription': f"Synthetic extension number {index}",
+        'lastUpdated': '2024-01-01T00:00:00Z',
+        'publisher': {'publisherName': publisher},
+        'statistics': [
+            {'statisticName': 'install', 'value': float(1000000 - index)},
+            {'statisticName': 'averagerating', 'value': 4.5},
+            {'statisticName': 'ratingcount', 'value': float(index % 500)},
+            {'statisticName': 'updateCount', 'value': float(index % 50)},
+            {'statisticName': 'trendingdaily', 'value': 0.1},
+            {'statisticName': 'trendingweekly', 'value': 0.7},
+            {'statisticName': 'trendingmonthly', 'value': 3.0},
+            {'statisticName': 'trendingOverall', 'value': 1.2},
+        ],
+        'versions': [{
+            'version': '1.0.0',
+            'properties': [{'key': 'Microsoft.VisualStudio.Services.Links.Source',
+                            'value': f"https://github.com/o{index}/r{index}.git"},
+                           {'key': 'RepositoryUri', 'value': f"https://github.com/o{index}/r{index}"}],
+            'files': [
+                {'assetType': 'Microsoft.VisualStudio.Services.Icons.Default',
+                 'source': f"https://{CDN_HOST}/{publisher}/{name}/icon.png"},
+                {'assetType': 'Microsoft.VisualStudio.Code.Manifest',
+                 'source': f"https://{CDN_HOST}/{publisher}/{name}/package.json"},
+            ],
+        }],
+    }
+
+def synthetic_repository(index):
+    """
+    GitHub GraphQL `RepoFields` fragment for synthetic repository o{index}/r{index}.
+    """
+    return {
+        'databaseId': index, 'name': f"r{index}", 'isFork': False, 'forkCount': index % 30,
+        'stargazerCount': index % 1000, 'diskUsage': 1024 + index % 4096, 'homepageUrl': None,
+        'createdAt': '2020-01-01T00:00:00Z', 'pushedAt': '2024-01-01T00:00:00Z', 'updatedAt': '2024-01-01T00:00:00Z',
+        'hasWikiEnabled': True, 'isArchived': False, 'isDisabled': False, 'isLocked': False,
+        'primaryLanguage': {'name': 'TypeScript'}, 'licenseInfo': {'name': 'MIT License'},
+        'defaultBranchRef': {'name': 'main', 'target': {'oid': f"{index:040x}", 'message': 'Update',
+                                                        'history': {'totalCount': 100 + index % 900}}},
+        'refs': {'totalCount': 3}, 'releases': {'totalCount': 5}, 'watchers': {'totalCount': 7},
+        'issues': {'totalCount': 20}, 'openIssues': {'totalCount': 4}, 'pullRequests': {'totalCount': 12},
+        'openPullRequests': {'totalCount': 1}, 'labels': {'totalCount': 9},
+        'languages': {'edges': [{'size': 50000, 'node': {'name': 'TypeScript'}},
+                                {'size': 2000, 'node': {'name': 'JavaScript'}}]},
+        'repositoryTopics': {'nodes': [{'topic': {'name': 'vscode'}}]},
+    }
+
+def synthetic_rest_repository(index):
+    """
+    GitHub REST `/repos/{owner}/{repo}` payload for synthetic repository o{index}/r{index}.
+    """
+    base = f"https://{GITHUB_HOST}/repos/o{index}/r{index}"
+    return {
+        'id': index, 'name': f"r{index}", 'fork': False, 'forks_count': index % 30, 'language': 'TypeScript',
+        'default_branch': 'main', 'license': {'name': 'MIT License'}, 'homepage': None,
+        'watchers_count': index % 1000, 'stargazers_count': index % 1000, 'size': 1024 + index % 4096,
+        'created_at': '2020-01-01T00:00:00Z', 'pushed_at': '2024-01-01T00:00:00Z', 'updated_at': '2024-01-01T00:00:00Z',
+        'open_issues_count': 4, 'has_wiki': True, 'archived': False, 'disabled': False, 'topics': ['vscode'],
+        'commits_url': f"{base}/commits{{/sha}}", 'branches_url': f"{base}/branches{{/branch}}",
+        'releases_url': f"{base}/releases{{/id}}", 'contributors_url': f"{base}/contributors",
+        'pulls_url': f"{base}/pulls{{/number}}", 'languages_url': f"{base}/languages",
+        'labels_url': f"{base}/labels{{/name}}",
+    }
+
+class FakeServices:
+    """
+    Local stand-in for the Marketplace, its CDN and the GitHub REST/GraphQL APIs,
+    serving a deterministic catalog of `total_extensions` synthetic extensions.
+
+    Faults are injected per request: `latency` seconds of delay, a fraction of
+    5xx errors (`error_rate`), 403 rate-limit responses on GitHub (`rate_limit_rate`)
+    and 202 "stats pending" answers on code_frequency (`stats_pending_rate`).
+    Requests reach it through LocalRedirectAdapter, which keeps the original host
+    as the first path segment.
+    """
+    def __init__(self, total_extensions, latency=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 stats_pending_rate=0.0, seed=0):
+        self.total_extensions = total_extensions
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stats_pending_rate = stats_pending_rate
+        self.requests = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                services._handle(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                services._handle(self, json.loads(self.rfile.read(length) or b'null'))
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self, total_extensions=None):
+        with self._lock:
+            self.requests.clear()
+            if total_extensions is not None:
+                self.total_extensions = total_extensions
+
+    def _chance(self, rate):
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def _handle(self, handler, body):
+        host, _, path = handler.path.lstrip('/').partition('/')
+        path = '/' + path.split('?', 1)[0]
+        route = self._route_name(host, path)
+        with self._lock:
+            self.requests[route] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+        if self._chance(self.error_rate):
+            return self._send(handler, 503, {'message': 'Service Unavailable'})
+        if host == GITHUB_HOST and self._chance(self.rate_limit_rate):
+            reset = int(time.time()) + 1
+            return self._send(handler, 403, {'message': 'API rate limit exceeded'},
+                              {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(reset)})
+
+        status, payload = self._respond(host, path, body)
+        headers = {'X-RateLimit-Remaining': '4999', 'X-RateLimit-Reset': str(int(time.time()) + 3600)}
+        self._send(handler, status, payload, headers if host == GITHUB_HOST else None)
+
+    def _route_name(self, host, path):
+        if host == GITHUB_HOST and path.startswith('/repos/'):
+            parts = path.split('/')
+            return f"github:{'/'.join(parts[4:]) or 'repo'}"
+        return f"{host.split('.')[0]}:{path.rsplit('/', 1)[-1]}"
+
+    def _respond(self, host, path, body):
+        if host == MARKETPLACE_HOST and path.endswith('/extensionquery'):
+            return 200, self._extension_query(body['filters'][0])
+        if host == CDN_HOST and path.endswith('/package.json'):
+            index = int(path.split('/')[1][len('pub'):])
+            return 200, {'name': f"ext{index}", 'version': '1.0.0', 'keywords': ['synthetic', 'benchmark'],
+                         'categories': ['Other'], 'repository': {'url': f"https://github.com/o{index}/r{index}"}}
+        if host == GITHUB_HOST and path == '/graphql':
+            data = {alias: synthetic_repository(int(owner[1:]))
+                    for alias, owner, _ in GRAPHQL_ALIAS.findall(body['query'])}
+            return 200, {'data': data}
+        if host == GITHUB_HOST and path.startswith('/repos/'):
+            parts = path.split('/')
+            index = int(parts[2][1:])
+            if len(parts) == 4:
+                return 200, synthetic_rest_repository(index)
+            if parts[4] == 'commits':
+                return 200, [{'sha': f"{index:040x}", 'commit': {'message': 'Update'}}]
+            if parts[4:] == ['stats', 'code_frequency']:
+                if self._chance(self.stats_pending_rate):
+                    return 202, {}
+                return 200, [[1700000000 + week * 604800, 500, -120] for week in range(10)]
+        return 404, {'message': 'Not Found'}
+
+    def _extension_query(self, query):
+        criteria = query['criteria']
+        names = [criterion['value'] for criterion in criteria if criterion['filterType'] == 7]
+        if names:
+            indexes = [int(match.group(1)) for match in map(EXTENSION_NAME.fullmatch, names) if match]
+            extensions = [synthetic_extension(index) for index in indexes if index < self.total_extensions]
+            total = len(extensions)
+        else:
+            page_size = query.get('pageSize', 50)
+            start = (query.get('pageNumber', 1) - 1) * page_size
+            extensions = [synthetic_extension(index)
+                          for index in range(start, min(start + page_size, self.total_extensions))]
+            total = self.total_extensions
+        return {'results': [{
+            'extensions': extensions,
+            'resultMetadata': [{'metadataType': 'ResultCount',
+                                'metadataItems': [{'name': 'TotalCount', 'count': total}]}],
+        }]}
+
+    def _send(self, handler, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+class LocalRedirectAdapter(HTTPAdapter):
+    """
+    Transport adapter that sends every request to the fake services instead of the
+    real host, e.g. https://api.github.com/graphql -> {base_url}/api.github.com/graphql.
+    """
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = f"{self.base_url}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else '')
+        return super().send(request, **kwargs)
+
+def redirect_session(session, base_url, pool_size=16):
+    """
+    Point a requests.Session at the fake services for every https:// URL.
+    """
+    session.mount('https://', LocalRedirectAdapter(base_url, pool_connections=pool_size, pool_maxsize=pool_size))
+    return session
@@ -0,0 +1,14 @@
+import * as vscode from 'vscode';
+
+const files = await vscode.workspace.findFiles('**/*.ts', '**/node_modules/**');
+const pattern = "src/**/*.js"; // glob
+const template = `dist/*/index.js`;
+
+/* a real
+ * block comment
+
+ */
+export function activate() {
+    return files; /* trailing block */
+}
+// line comment
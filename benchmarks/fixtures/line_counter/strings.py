@@ -0,0 +1,16 @@
+"""Module docstring
+spanning lines.
+"""
+import glob
+
+PATTERN = "**/*.py"
+QUERY = """SELECT *
+FROM t"""
+files = glob.glob('src/**/*.py')  # /* not a comment
+
+# comment
+
+
+def f():
+    '''Docstring.'''
+    return files
@@ -0,0 +1,387 @@
+"""
+End-to-end throughput benchmarks for the collectors and the CodeQL stage.
+
+The collectors run against FakeServices, a local stand-in for the Marketplace and
+GitHub, and CodeQL is replaced by stub_codeql.py, so runs are reproducible and
+never touch live endpoints. Every scenario runs in its own process to get a
+clean peak RSS figure.
+
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 50000 --latency 0.005 --error-rate 0.01
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path[:0] = [BENCHMARKS_DIR] + [os.path.join(REPO_DIR, name)
+                                   for name in ('data_collection_benjamin', 'data_collection', 'codeql_multi_repo')]
+
+from fake_services import FakeServices, redirect_session
+
+COLLECTOR_SCENARIOS = ('extractor', 'fetch_vscode_extensions', 'github_rest')
+LOCAL_SCENARIOS = ('codeql', 'line_counter', 'sarif', 'writers', 'store', 'vsix')
+SCENARIOS = COLLECTOR_SCENARIOS + LOCAL_SCENARIOS
+
+def count_lines(path):
+    with open(path, 'r', encoding='utf-8') as input_file:
+        return sum(1 for line in input_file if line.strip())
+
+def bench_extractor(size, base_url, workdir):
+    """
+    Full ExtensionMetadataExtractor.run pipeline; records are the extensions that reach stage 4.
+    """
+    from extension_metadata_extractor import ExtensionMetadataExtractor
+    extractor = ExtensionMetadataExtractor('benchmark-token', data_dir=os.path.join(workdir, 'data'))
+    redirect_session(extractor.transport.session, base_url)
+    extractor.run(max_results=size)
+    return count_lines(os.path.join(extractor.data_dir, '4_github_metadata.jsonl'))
+
+def bench_fetch_vscode_extensions(size, base_url, workdir):
+    """
+    data_collection.fetch_vscode_extensions for a single search term.
+    """
+    import fetch_extensions
+    redirect_session(fetch_extensions.TRANSPORT.session, base_url)
+    return len(fetch_extensions.fetch_vscode_extensions(['benchmark'], size))
+
+def bench_github_rest(size, base_url, workdir):
+    """
+    GitHubMetadataFetcher.extract_github_metadata_to_json with the REST backend.
+    """
+    from github_metadata_fetcher import GitHubMetadataFetcher
+    from http_transport import HttpTransport
+    input_file = os.path.join(workdir, 'extensions.jsonl')
+    output_file = os.path.join(workdir, 'github_metadata.jsonl')
+    with open(input_file, 'w', encoding='utf-8') as extensions_file:
+        for index in range(size):
+            extensions_file.write(json.dumps({'publisher_name': f"pub{index}", 'ext_name': f"ext{index}",
+                                              'repository': f"https://github.com/o{index}/r{index}"}) + '\n')
+    fetcher = GitHubMetadataFetcher('benchmark-token', transport=HttpTransport())
+    redirect_session(fetcher.token_pool.transport.session, base_url)
+    fetcher.extract_github_metadata_to_json(input_file, output_file)
+    return count_lines(output_file)
+
+def bench_codeql(size, base_url, workdir, workers=4):
+    """
+    process_repositories over `size` empty repositories with the stub codeql binary.
+    """
+    os.environ['CODEQL_BIN'] = os.path.join(BENCHMARKS_DIR, 'stub_codeql.py')
+    import pandas as pd
+    import codeql_analysis
+    from codeql_analysis import process_repositories
+    # The stub ignores the suite, but analyze_repository checks that the file exists
+    codeql_analysis.CODEQL_SUITES_PATH = os.path.join(workdir, 'suites')
+    for suite in set(codeql_analysis.language_suites.values()):
+        os.makedirs(os.path.dirname(os.path.join(codeql_analysis.CODEQL_SUITES_PATH, suite)), exist_ok=True)
+        with open(os.path.join(codeql_analysis.CODEQL_SUITES_PATH, suite), 'w') as suite_file:
+            suite_file.write('- queries: .\n')
+    base_dir = os.path.join(workdir, 'repos')
+    rows = []
+    for index in range(size):
+        os.makedirs(os.path.join(base_dir, f"o{index}", f"r{index}"))
+        rows.append({'repo_owner': f"o{index}", 'repo_name': f"r{index}", 'language': 'JavaScript',
+                     'size': 1024 + index % 4096})
+    statuses = process_repositories(pd.DataFrame(rows), base_dir, os.path.join(workdir, 'results'), size,
+                                    max_workers=workers, total_ram_mb=workers * 4096)
+    analyzed = sum(status == 'ok' for status in statuses.values())
+    if analyzed != size:
+        failed = {repo: status for repo, status in statuses.items() if status != 'ok'}
+        raise AssertionError(f"expected {size} analyzed repositories, got {analyzed}: {dict(list(failed.items())[:5])}")
+    return analyzed
+
+def bench_line_counter(size, base_url, workdir):
+    """
+    LineCounter over `size` copies of the fixtures in fixtures/line_counter, checked against expected.json.
+    """
+    from line_counter import LineCounter
+    fixtures_dir = os.path.join(BENCHMARKS_DIR, 'fixtures', 'line_counter')
+    with open(os.path.join(fixtures_dir, 'expected.json'), 'r', encoding='utf-8') as expected_file:
+        expected = json.load(expected_file)
+    repo_path = os.path.join(workdir, 'repo')
+    for index in range(size):
+        shutil.copytree(fixtures_dir, os.path.join(repo_path, f"copy{index}"))
+    counter = LineCounter()
+    try:
+        languages = counter.count(repo_path)['languages']
+    finally:
+        counter.close()
+    for language, counts in expected.items():
+        scaled = {name: value * size for name, value in counts.items()}
+        if languages.get(language) != scaled:
+            raise AssertionError(f"{language}: expected {scaled}, counted {languages.get(language)}")
+    return sum(counts['files'] for counts in languages.values())
+
+def bench_sarif(size, base_url, workdir):
+    """
+    aggregate_sarif over `size` copies of the query-pack SARIF in fixtures/sarif, streamed with ijson and checked
+    against expected.json; the json.load fallback must parse the fixture the same way.
+    """
+    import sarif_aggregator
+    from sarif_aggregator import aggregate_sarif, parse_sarif
+    if sarif_aggregator.ijson is None:
+        raise AssertionError("ijson is not installed: the streaming SARIF parser cannot be checked (pip install -r requirements.txt)")
+    fixtures_dir = os.path.join(BENCHMARKS_DIR, 'fixtures', 'sarif')
+    with open(os.path.join(fixtures_dir, 'expected.json'), 'r', encoding='utf-8') as expected_file:
+        expected = [tuple(row) for row in json.load(expected_file)]
+    fixture = next(name for name in os.listdir(fixtures_dir) if name.endswith('.sarif'))
+    results_dir = os.path.join(workdir, 'results')
+    os.makedirs(results_dir)
+    owner, repo, suffix = fixture.split('____', 2)
+    for index in range(size):
+        # The copies differ after the owner____repo____ prefix, so they all parse as the fixture's repository
+        shutil.copy(os.path.join(fixtures_dir, fixture), os.path.join(results_dir, f"{owner}____{repo}____{index:06d}-{suffix}"))
+    df = aggregate_sarif(results_dir)
+    # security_severity is stored as float32
+    df['security_severity'] = df['security_severity'].astype('float64').round(1)
+    rows = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    if rows != expected * size:
+        raise AssertionError(f"expected {len(expected) * size} findings like {expected}, parsed {len(rows)} like {rows[:len(expected)]}")
+    # The json.load fallback must parse the fixture exactly like the streaming parser used above
+    streamed = parse_sarif(os.path.join(fixtures_dir, fixture))
+    sarif_aggregator.ijson = None
+    try:
+        loaded = parse_sarif(os.path.join(fixtures_dir, fixture))
+    finally:
+        sarif_aggregator.ijson = sys.modules['ijson']
+    if loaded != streamed:
+        raise AssertionError(f"the json fallback parsed {loaded}, the streaming parser {streamed}")
+    return len(rows)
+
+def bench_writers(size, base_url, workdir):
+    """
+    StageWriter to JSONL, CSV and Parquet for `size` records whose late rows add a column and turn a count into a URL.
+    """
+    import pyarrow.parquet as pq
+    from writers import StageWriter
+    records = []
+    for index in range(size):
+        record = {'publisher_name': f"pub{index}", 'ext_name': f"ext{index}", 'install_count': index,
+                  'commits': index if index < size // 2 else f"https://api.github.com/repos/o{index}/r{index}/commits{{/sha}}"}
+        if index >= size * 3 // 4:
+            # First seen well after the first row group
+            record['vsix_error'] = 'Paquete no disponible'
+        records.append(record)
+    paths = [os.path.join(workdir, f"stage.{extension}") for extension in ('jsonl', 'csv', 'parquet')]
+    writer = StageWriter(paths)
+    writer.writers[-1].chunk_size = max(size // 10, 1)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    expected = [{'publisher_name': record['publisher_name'], 'ext_name': record['ext_name'],
+                 'install_count': record['install_count'], 'commits': str(record['commits']),
+                 'vsix_error': record.get('vsix_error')} for record in records]
+    rows = pq.read_table(paths[-1]).to_pylist()
+    if rows != expected:
+        mismatches = [(row, expected_row) for row, expected_row in zip(rows, expected) if row != expected_row]
+        raise AssertionError(f"expected {len(expected)} Parquet rows, read {len(rows)}; first mismatches: {mismatches[:3]}")
+    if count_lines(paths[0]) != size:
+        raise AssertionError(f"expected {size} JSONL lines, got {count_lines(paths[0])}")
+    return len(rows)
+
+def bench_store(size, base_url, workdir):
+    """
+    ExtensionStore upserts of stages 2 and 4 for `size` extensions; stage 4 carries nulls that must not erase stage 2.
+    """
+    from extension_store import ExtensionStore
+    store = ExtensionStore(os.path.join(workdir, 'extensions.db'))
+    stage2 = [{'publisher_name': f"pub{index}", 'ext_name': f"ext{index}", 'install_count': index, 'categories': 'Other',
+               'repository': f"https://github.com/o{index}/r{index}", 'homepage': f"https://example.com/{index}",
+               'license': 'MIT', 'codeLines': None} for index in range(size)]
+    stage4 = [{'publisher_name': f"pub{index}", 'ext_name': f"ext{index}", 'id': index + 1, 'stargazers': index,
+               'homepage': None, 'license': None, 'codeLines': index if index % 2 else None} for index in range(size)]
+    store.upsert(stage2, stage=2)
+    store.upsert(stage4, stage=4)
+    for index in range(size):
+        expected = dict(stage2[index], id=index + 1, stargazers=index, codeLines=index if index % 2 else None)
+        stored = store.get(f"pub{index}.ext{index}")
+        if stored != expected:
+            raise AssertionError(f"expected {expected}, stored {stored}")
+    found = sum(1 for _ in store.query(github_only=True, min_installs=0))
+    store.close()
+    if found != size:
+        raise AssertionError(f"expected {size} GitHub extensions from query, got {found}")
+    return found
+
+class FixtureResponse:
+    """
+    Streamed response that serves a fixture file, standing in for a VSIX download.
+    """
+    def __init__(self, path):
+        self.status_code = 200
+        self.path = path
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        with open(self.path, 'rb') as fixture_file:
+            yield from iter(lambda: fixture_file.read(chunk_size), b'')
+
+    def close(self):
+        self.closed = True
+
+def bench_vsix(size, base_url, workdir):
+    """
+    VsixAnalyzer over `size` copies of the package in fixtures/vsix, checked against expected.json; a second pass must be served from the cache.
+    """
+    from vsix_analyzer import VsixAnalyzer, VsixCache
+    fixtures_dir = os.path.join(BENCHMARKS_DIR, 'fixtures', 'vsix')
+    with open(os.path.join(fixtures_dir, 'expected.json'), 'r', encoding='utf-8') as expected_file:
+        expected = json.load(expected_file)
+    fixture = os.path.join(fixtures_dir, next(name for name in os.listdir(fixtures_dir) if name.endswith('.vsix')))
+    responses = []
+
+    def send(method, url, **kwargs):
+        responses.append(FixtureResponse(fixture))
+        return responses[-1]
+
+    extensions = [{'publisher_name': 'octo', 'ext_name': f"fixture{index}", 'version': '1.0.0',
+                   'vsix_url': f"https://octo.gallery.vsassets.io/fixture{index}.vsix"} for index in range(size)]
+    analyzer = VsixAnalyzer(VsixCache(os.path.join(workdir, 'vsix'), send=send))
+    records = list(analyzer.iter_package_metrics(dict(ext) for ext in extensions))
+    if len(responses) != size or not all(response.closed for response in responses):
+        raise AssertionError(f"expected {size} closed downloads, got {len(responses)}")
+    for ext, record in zip(extensions, records):
+        if record != dict(publisher_name='octo', ext_name=ext['ext_name'], version='1.0.0', **expected):
+            raise AssertionError(f"expected {expected} for {ext['ext_name']}, analyzed {record}")
+    # Published packages never change, so the second pass must not download anything
+    if list(analyzer.iter_package_metrics(dict(ext) for ext in extensions)) != records or len(responses) != size:
+        raise AssertionError(f"expected the second pass to hit the cache, made {len(responses) - size} more downloads")
+    return len(records)
+
+BENCHMARKS = {
+    'extractor': bench_extractor,
+    'fetch_vscode_extensions': bench_fetch_vscode_extensions,
+    'github_rest': bench_github_rest,
+    'codeql': bench_codeql,
+    'line_counter': bench_line_counter,
+    'sarif': bench_sarif,
+    'writers': bench_writers,
+    'store': bench_store,
+    'vsix': bench_vsix,
+}
+
+def run_child(args):
+    """
+    Run one scenario in this process and write its timing and peak RSS to args.result_file.
+    """
+    kwargs = {'workers': args.codeql_workers} if args.child == 'codeql' else {}
+    start = time.perf_counter()
+    records = BENCHMARKS[args.child](args.size, args.base_url, args.workdir, **kwargs)
+    seconds = time.perf_counter() - start
+    with open(args.result_file, 'w', encoding='utf-8') as result_file:
+        json.dump({
+            'records': records,
+            'seconds': round(seconds, 3),
+            'records_per_sec': round(records / seconds, 1) if seconds else None,
+            # ru_maxrss is reported in KB on Linux
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }, result_file)
+
+def run_scenario(scenario, size, services, args):
+    """
+    Launch a scenario in a child process and combine its result with the server's request counts.
+    """
+    workdir = tempfile.mkdtemp(prefix=f"bench-{scenario}-{size}-")
+    result_path = os.path.join(workdir, 'result.json')
+    command = [sys.executable, os.path.abspath(__file__), '--child', scenario, '--size', str(size),
+               '--workdir', workdir, '--result-file', result_path, '--codeql-workers', str(args.codeql_workers),
+               '--base-url', services.base_url if services else '']
+    if services:
+        services.reset(total_extensions=size)
+    with open(os.path.join(workdir, 'output.log'), 'w') as log_file:
+        completed = subprocess.run(command, stdout=log_file, stderr=subprocess.STDOUT)
+
+    result = {'scenario': scenario, 'size': size}
+    if completed.returncode != 0 or not os.path.exists(result_path):
+        result['error'] = f"exit code {completed.returncode}, see {os.path.join(workdir, 'output.log')}"
+        return result
+    with open(result_path, 'r', encoding='utf-8') as result_file:
+        result.update(json.load(result_file))
+    if services:
+        requests_made = sum(services.requests.values())
+        result['requests'] = requests_made
+        result['requests_per_record'] = round(requests_made / result['records'], 2) if result['records'] else None
+        result['requests_by_route'] = dict(services.requests)
+    if not args.keep_workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+def print_report(results):
+    print(f"{'scenario':<25}{'size':>8}{'records':>9}{'seconds':>10}{'rec/s':>10}{'req/rec':>9}{'peak MB':>9}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['scenario']:<25}{result['size']:>8}  failed: {result['error']}")
+            continue
+        print(f"{result['scenario']:<25}{result['size']:>8}{result['records']:>9}{result['seconds']:>10}"
+              f"{result['records_per_sec']:>10}{result.get('requests_per_record') or '-':>9}{result['peak_rss_mb']:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the collectors and the CodeQL stage against local fakes.")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 50000],
+                        help="Number of synthetic extensions for the collector scenarios")
+    parser.add_argument('--codeql-sizes', nargs='+', type=int, default=[20, 100, 500],
+                        help="Number of repositories for the codeql scenario")
+    parser.add_argument('--codeql-workers', type=int, default=4)
+    parser.add_argument('--line-counter-sizes', nargs='+', type=int, default=[100, 1000],
+                        help="Copies of the line counter fixtures for the line_counter scenario")
+    parser.add_argument('--sarif-sizes', nargs='+', type=int, default=[100, 1000],
+                        help="Copies of the SARIF fixture for the sarif scenario")
+    parser.add_argument('--writers-sizes', nargs='+', type=int, default=[1000, 100000],
+                        help="Number of records for the writers scenario")
+    parser.add_argument('--store-sizes', nargs='+', type=int, default=[1000, 10000],
+                        help="Number of extensions for the store scenario")
+    parser.add_argument('--vsix-sizes', nargs='+', type=int, default=[100, 1000],
+                        help="Copies of the VSIX fixture for the vsix scenario")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every fake response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fraction of GitHub 403 rate-limit responses")
+    parser.add_argument('--stats-pending-rate', type=float, default=0.0, help="Fraction of 202 code_frequency responses")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--keep-workdir', action='store_true', help="Keep each scenario's data and log")
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    services = None
+    if any(scenario in COLLECTOR_SCENARIOS for scenario in args.scenarios):
+        services = FakeServices(0, latency=args.latency, error_rate=args.error_rate,
+                                rate_limit_rate=args.rate_limit_rate, stats_pending_rate=args.stats_pending_rate,
+                                seed=args.seed)
+        services.start()
+
+    results = []
+    try:
+        for scenario in args.scenarios:
+            sizes = {'codeql': args.codeql_sizes, 'line_counter': args.line_counter_sizes,
+                     'sarif': args.sarif_sizes, 'writers': args.writers_sizes,
+                     'store': args.store_sizes, 'vsix': args.vsix_sizes}.get(scenario, args.sizes)
+            for size in sizes:
+                print(f"Running {scenario} with {size}...", flush=True)
+                results.append(run_scenario(scenario, size, services if scenario not in LOCAL_SCENARIOS else None, args))
+    finally:
+        if services:
+            services.stop()
+
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=4)
+        print(f"Results saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the `codeql` CLI used by the benchmarks: `database create` makes the
+database directory (one per language with --db-cluster) and `database analyze` writes
+a small SARIF file. Each call sleeps STUB_CODEQL_SECONDS (default 0.05) to stand in
+for the real work.
+"""
+import json
+import os
+import sys
+import time
+
+# Same layout as a query-pack analysis: the rules live in tool.extensions and each
+# result points to its rule through rule.toolComponent.index and rule.index
+SARIF = {
+    'version': '2.1.0',
+    'runs': [{
+        'tool': {
+            'driver': {'name': 'CodeQL'},
+            'extensions': [{'name': 'codeql/javascript-queries', 'rules': [{
+                'id': 'js/xss',
+                'properties': {'problem.severity': 'error', 'security-severity': '6.1',
+                               'tags': ['security', 'external/cwe/cwe-079']},
+            }]}],
+        },
+        'results': [{
+            'ruleId': 'js/xss', 'rule': {'id': 'js/xss', 'index': 0, 'toolComponent': {'index': 0}}, 'level': 'error',
+            'locations': [{'physicalLocation': {'artifactLocation': {'uri': 'src/extension.ts'},
+                                                'region': {'startLine': 42}}}],
+        }],
+    }],
+}
+
+def main(args):
+    time.sleep(float(os.environ.get('STUB_CODEQL_SECONDS', '0.05')))
+    if args[:2] == ['database', 'create']:
+        languages = next(arg for arg in args if arg.startswith('--language=')).split('=', 1)[1].split(',')
+        databases = [os.path.join(args[2], language) for language in languages] if '--db-cluster' in args else [args[2]]
+        for database, language in zip(databases, languages):
+            os.makedirs(database, exist_ok=True)
+            with open(os.path.join(database, 'codeql-database.yml'), 'w') as database_file:
+                database_file.write(f"primaryLanguage: {language}\n")
+    elif args[:2] == ['database', 'analyze']:
+        output = args[args.index('--output') + 1]
+        with open(output, 'w') as sarif_file:
+            json.dump(SARIF, sarif_file)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
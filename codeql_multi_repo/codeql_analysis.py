@@ -1,11 +1,33 @@
+import json
 import os
+import signal
 import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 from tqdm import tqdm
+from codeql_db_cache import DatabaseCache, repo_head_sha
+from repo_cloner import clone_repositories, load_repo_list
+
+# The shared job queue and metrics live with the collectors
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data_collection_benjamin'))
+from job_queue import JobQueue, default_worker_id
+from metrics import Metrics
+
+CODEQL_QUEUE = 'codeql'
 
 # Define the path to CodeQL suites with correct $HOME expansion
 CODEQL_SUITES_PATH = os.path.expanduser('~/codeql/codeql-repo')
 
+# CodeQL executable; override with CODEQL_BIN or put a different `codeql` first on PATH
+CODEQL_BIN = os.environ.get('CODEQL_BIN', 'codeql')
+
+# Memory estimate for a CodeQL job: a fixed base plus a multiple of the repo size
+BASE_JOB_RAM_MB = 2048
+RAM_MB_PER_REPO_MB = 4
+
 # Define supported languages and their corresponding suites
 language_suites = {
     'JavaScript': 'javascript/ql/src/codeql-suites/javascript-security-extended.qls',
@@ -14,9 +36,38 @@ language_suites = {
     'Go': 'go/ql/src/codeql-suites/go-security-extended.qls',
     'Java': 'java/ql/src/codeql-suites/java-security-extended.qls',
     'C': 'cpp/ql/src/codeql-suites/cpp-security-extended.qls',
+    'C++': 'cpp/ql/src/codeql-suites/cpp-security-extended.qls',
     'C#': 'csharp/ql/src/codeql-suites/csharp-security-extended.qls'
 }
 
+# CodeQL extractor for each language; JavaScript and TypeScript share one database
+CODEQL_LANGUAGES = {
+    'JavaScript': 'javascript',
+    'TypeScript': 'javascript',
+    'Python': 'python',
+    'Go': 'go',
+    'Java': 'java',
+    'C': 'cpp',
+    'C++': 'cpp',
+    'C#': 'csharp',
+}
+
+# Source file extensions used to detect languages in a clone
+LANGUAGE_EXTENSIONS = {
+    '.js': 'JavaScript', '.jsx': 'JavaScript', '.mjs': 'JavaScript', '.cjs': 'JavaScript',
+    '.ts': 'TypeScript', '.tsx': 'TypeScript', '.mts': 'TypeScript', '.cts': 'TypeScript',
+    '.py': 'Python',
+    '.go': 'Go',
+    '.java': 'Java',
+    '.c': 'C', '.h': 'C',
+    '.cc': 'C++', '.cpp': 'C++', '.cxx': 'C++', '.hh': 'C++', '.hpp': 'C++',
+    '.cs': 'C#',
+}
+SKIPPED_DIRS = {'.git', 'node_modules', 'vendor', 'third_party'}
+
+# Languages with less code than this are ignored, e.g. a lone build script
+MIN_LANGUAGE_BYTES = 1024
+
 def create_directories(results_dir):
     """
     Create the necessary directories for storing CodeQL databases and results.
@@ -27,22 +78,101 @@ def create_directories(results_dir):
     os.makedirs(codeql_results_dir, exist_ok=True)
     return databases_dir, codeql_results_dir
 
-def create_codeql_database(repo_owner, repo_name, repo_path, db_name, language):
+def run_codeql(command, timeout=None):
     """
-    Check if the CodeQL database exists for a repository. If not, create it.
+    Run a CodeQL command in its own process group so a timeout kills the whole tree.
     """
-    if os.path.exists(db_name):
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+        raise
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, output=stdout, stderr=stderr)
+
+def resource_flags(threads=0, ram=None):
+    """
+    Build the --threads/--ram options shared by `database create` and `database analyze`.
+    """
+    flags = ['--threads=' + str(threads)]
+    if ram:
+        flags.append('--ram=' + str(int(ram)))
+    return flags
+
+def parse_github_languages(languages):
+    """
+    Bytes per language from the GitHub languages data, either a dict or the
+    "TypeScript: 52000, Python: 4100" string stored in stage 4. Anything else gives {}.
+    """
+    if isinstance(languages, dict):
+        return {name: int(size) for name, size in languages.items()}
+    sizes = {}
+    if isinstance(languages, str):
+        for part in languages.split(','):
+            name, _, size = part.rpartition(':')
+            if name.strip() and size.strip().isdigit():
+                sizes[name.strip()] = int(size)
+    return sizes
+
+def scan_languages(repo_path):
+    """
+    Bytes of source code per language in a clone, by file extension.
+    """
+    sizes = {}
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [name for name in dirs if name not in SKIPPED_DIRS]
+        for name in files:
+            language = LANGUAGE_EXTENSIONS.get(os.path.splitext(name)[1].lower())
+            if language:
+                try:
+                    sizes[language] = sizes.get(language, 0) + os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+    return sizes
+
+def detect_languages(row, repo_path, min_bytes=MIN_LANGUAGE_BYTES):
+    """
+    Supported languages of a repository with at least min_bytes of code, largest first.
+    Uses the GitHub `languages` column when the row has one, otherwise scans the clone.
+    """
+    sizes = parse_github_languages(row.get('languages')) or scan_languages(repo_path)
+    return [language for language, size in sorted(sizes.items(), key=lambda item: -item[1])
+            if language in language_suites and size >= min_bytes]
+
+def create_codeql_database(repo_owner, repo_name, repo_path, db_name, language, threads=0, ram=None, timeout=None,
+                           db_cache=None, head_sha=None):
+    """
+    Check if a CodeQL database built from the repository's current HEAD exists. If not, create it.
+    With a list of CodeQL languages, a cluster is built instead: every language is extracted in
+    the same source traversal into its own database under db_name/<language>.
+    """
+    cluster = isinstance(language, (list, tuple))
+    cache_key = ','.join(language) if cluster else language
+    db_cache = db_cache or DatabaseCache(os.path.dirname(db_name))
+    head_sha = head_sha or repo_head_sha(repo_path)
+    if db_cache.is_current(db_name, head_sha, cache_key):
         print(f"Database already exists for {repo_owner}/{repo_name}")
         return True
 
     create_db_command = [
-        'codeql', 'database', 'create', db_name,
-        '--language=' + language.lower(), '--source-root', repo_path
-    ]
+        CODEQL_BIN, 'database', 'create', db_name,
+        '--language=' + (cache_key if cluster else CODEQL_LANGUAGES.get(language, language.lower())),
+        '--source-root', repo_path
+    ] + (['--db-cluster'] if cluster else []) + resource_flags(threads, ram)
+    if os.path.exists(db_name):
+        # Built from another commit or language: rebuild it in place
+        print(f"Database for {repo_owner}/{repo_name} is stale")
+        create_db_command.append('--overwrite')
     try:
         print(f"Creating database for {repo_owner}/{repo_name}...")
-        subprocess.run(create_db_command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        run_codeql(create_db_command, timeout=timeout)
+        db_cache.record(db_name, head_sha, cache_key)
         return True
+    except subprocess.TimeoutExpired:
+        print(f"Timed out creating database for {repo_owner}/{repo_name} after {timeout}s")
+        return False
     except subprocess.CalledProcessError as e:
         print(f"Error creating database for {repo_owner}/{repo_name}")
         print("Command:", " ".join(create_db_command))
@@ -50,7 +180,7 @@ def create_codeql_database(repo_owner, repo_name, repo_path, db_name, language):
         print("Standard error:", e.stderr.decode('utf-8'))
         return False
 
-def analyze_repository(repo_owner, repo_name, db_name, result_file, language):
+def analyze_repository(repo_owner, repo_name, db_name, result_file, language, threads=0, ram=None, timeout=None):
     """
     Analyze the CodeQL database for a repository using the appropriate suite.
     """
@@ -60,13 +190,16 @@ def analyze_repository(repo_owner, repo_name, db_name, result_file, language):
         return False
 
     analyze_command = [
-        'codeql', 'database', 'analyze', db_name,
+        CODEQL_BIN, 'database', 'analyze', db_name,
         suite_path, '--format=sarifv2.1.0', '--output', result_file
-    ]
+    ] + resource_flags(threads, ram)
     try:
         print(f"Analyzing {repo_owner}/{repo_name}...")
-        subprocess.run(analyze_command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        run_codeql(analyze_command, timeout=timeout)
         return True
+    except subprocess.TimeoutExpired:
+        print(f"Timed out analyzing {repo_owner}/{repo_name} after {timeout}s")
+        return False
     except subprocess.CalledProcessError as e:
         print(f"Error analyzing {repo_owner}/{repo_name}")
         print("Command:", " ".join(analyze_command))
@@ -74,50 +207,336 @@ def analyze_repository(repo_owner, repo_name, db_name, result_file, language):
         print("Standard error:", e.stderr.decode('utf-8'))
         return False
 
-def process_repositories(df, base_dir, results_dir, num_repos):
+def process_repository(row, base_dir, databases_dir, codeql_results_dir, threads=0, ram=None, timeout=None,
+                       db_cache=None, timings=None, multi_language=False):
+    """
+    Create the database and run the analysis for a single repository row.
+    Returns a short status string; the create and analyze durations go into `timings` if given.
+    With multi_language, every detected language is analyzed (see process_repository_cluster).
+    """
+    timings = {} if timings is None else timings
+    if multi_language:
+        return process_repository_cluster(row, base_dir, databases_dir, codeql_results_dir, threads, ram, timeout,
+                                          db_cache=db_cache, timings=timings)
+    repo_owner = row['repo_owner']
+    repo_name = row['repo_name']
+    language = row['language']
+
+    # Skip unsupported languages
+    if language not in language_suites:
+        print(f"Skipping {repo_owner}/{repo_name}: Unsupported language {language}")
+        return 'unsupported'
+
+    repo_path = os.path.join(base_dir, repo_owner, repo_name)
+    db_name = os.path.join(databases_dir, f"{repo_owner}-{repo_name}-db")
+    result_file = os.path.join(codeql_results_dir, f"{repo_owner}____{repo_name}____results.sarif")
+
+    # Validate repository path
+    if not os.path.exists(repo_path):
+        print(f"Repository path does not exist: {repo_path}")
+        return 'missing'
+
+    db_cache = db_cache or DatabaseCache(databases_dir)
+    head_sha = repo_head_sha(repo_path)
+
+    # Results from the same commit and language are reused without touching the database
+    if db_cache.is_current(result_file, head_sha, language):
+        print(f"Results already up to date for {repo_owner}/{repo_name}")
+        return 'cached'
+
+    try:
+        with db_cache.using(db_name):
+            # Create the CodeQL database
+            start = time.perf_counter()
+            created = create_codeql_database(repo_owner, repo_name, repo_path, db_name, language, threads, ram,
+                                             timeout, db_cache=db_cache, head_sha=head_sha)
+            timings['create_seconds'] = round(time.perf_counter() - start, 3)
+            if not created:
+                return 'create_failed'
+
+            # Analyze the repository
+            start = time.perf_counter()
+            analyzed = analyze_repository(repo_owner, repo_name, db_name, result_file, language, threads, ram, timeout)
+            timings['analyze_seconds'] = round(time.perf_counter() - start, 3)
+            if not analyzed:
+                return 'analyze_failed'
+            db_cache.record(result_file, head_sha, language)
+    finally:
+        db_cache.evict()
+
+    return 'ok'
+
+def process_repository_cluster(row, base_dir, databases_dir, codeql_results_dir, threads=0, ram=None, timeout=None,
+                               db_cache=None, timings=None):
+    """
+    Detect every supported language in a repository, build one cluster database for all of
+    them and analyze each language's database with its suite, writing one SARIF file per
+    CodeQL language. Returns 'partial' when only some of the languages could be analyzed.
+    """
+    timings = {} if timings is None else timings
+    repo_owner = row['repo_owner']
+    repo_name = row['repo_name']
+    repo_path = os.path.join(base_dir, repo_owner, repo_name)
+    if not os.path.exists(repo_path):
+        print(f"Repository path does not exist: {repo_path}")
+        return 'missing'
+
+    # One suite per CodeQL language, taken from its largest source language
+    suites = {}
+    for language in detect_languages(row, repo_path):
+        suites.setdefault(CODEQL_LANGUAGES[language], language)
+    if not suites:
+        print(f"Skipping {repo_owner}/{repo_name}: No supported languages found")
+        return 'unsupported'
+    timings['languages'] = list(suites)
+
+    db_name = os.path.join(databases_dir, f"{repo_owner}-{repo_name}-cluster")
+    result_files = {codeql_language: os.path.join(codeql_results_dir,
+                                                  f"{repo_owner}____{repo_name}____{codeql_language}____results.sarif")
+                    for codeql_language in suites}
+    db_cache = db_cache or DatabaseCache(databases_dir)
+    head_sha = repo_head_sha(repo_path)
+
+    pending = {codeql_language: language for codeql_language, language in suites.items()
+               if not db_cache.is_current(result_files[codeql_language], head_sha, language)}
+    if not pending:
+        print(f"Results already up to date for {repo_owner}/{repo_name}")
+        return 'cached'
+
+    failed = []
+    try:
+        with db_cache.using(db_name):
+            start = time.perf_counter()
+            created = create_codeql_database(repo_owner, repo_name, repo_path, db_name, list(suites), threads, ram,
+                                             timeout, db_cache=db_cache, head_sha=head_sha)
+            timings['create_seconds'] = round(time.perf_counter() - start, 3)
+            if not created:
+                return 'create_failed'
+
+            start = time.perf_counter()
+            for codeql_language, language in pending.items():
+                result_file = result_files[codeql_language]
+                if analyze_repository(repo_owner, repo_name, os.path.join(db_name, codeql_language), result_file,
+                                      language, threads, ram, timeout):
+                    db_cache.record(result_file, head_sha, language)
+                else:
+                    failed.append(codeql_language)
+            timings['analyze_seconds'] = round(time.perf_counter() - start, 3)
+    finally:
+        db_cache.evict()
+
+    if failed:
+        timings['failed_languages'] = failed
+        return 'analyze_failed' if len(failed) == len(pending) else 'partial'
+    return 'ok'
+
+class MemoryBudget:
+    """
+    Admission control: a job only starts when its estimated RAM fits in what is left.
+    A job larger than the whole budget still runs, but alone.
+    """
+    def __init__(self, total_mb):
+        self.total_mb = total_mb
+        self.available_mb = total_mb
+        self._condition = threading.Condition()
+
+    def acquire(self, mb):
+        mb = min(mb, self.total_mb)
+        with self._condition:
+            self._condition.wait_for(lambda: self.available_mb >= mb)
+            self.available_mb -= mb
+        return mb
+
+    def release(self, mb):
+        with self._condition:
+            self.available_mb += mb
+            self._condition.notify_all()
+
+def total_memory_mb():
+    """
+    Physical memory of the machine in MB.
+    """
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+
+def estimate_job_ram_mb(row):
+    """
+    Estimate the RAM a CodeQL job needs from the GitHub `size` column (KB).
+    """
+    size = row.get('size', 0)
+    size_mb = 0 if pd.isna(size) else float(size) / 1024
+    return int(BASE_JOB_RAM_MB + RAM_MB_PER_REPO_MB * size_mb)
+
+def write_run_report(jobs, results_dir, started_at):
+    """
+    Write the run report to codeql_run_report.json and codeql_metrics.prom in results_dir
+    with metrics.Metrics, the same JSON and Prometheus format as the collectors.
+    The create and analyze phases are stages, job statuses are events, and the
+    per-repository timings are kept in the JSON under `repositories`.
+    """
+    metrics = Metrics()
+    metrics.started_at = started_at
+    statuses = {}
+    for job in jobs.values():
+        statuses[job['status']] = statuses.get(job['status'], 0) + 1
+        metrics.count(f"codeql_{job['status']}")
+        for phase in ('create', 'analyze'):
+            if f"{phase}_seconds" in job:
+                metrics.observe_stage(f"codeql_{phase}", job[f"{phase}_seconds"])
+    report_path = os.path.join(results_dir, 'codeql_run_report.json')
+    prometheus_path = os.path.join(results_dir, 'codeql_metrics.prom')
+    metrics.export(report_path, prometheus_path, extra={'status': statuses, 'repositories': jobs})
+
+def process_repositories(df, base_dir, results_dir, num_repos, max_workers=1, total_threads=None,
+                         total_ram_mb=None, timeout=None, disk_budget_gb=None, multi_language=False):
     """
     Process a specified number of repositories by creating databases and running CodeQL analysis.
+    With max_workers > 1, repositories run in parallel, largest first, sharing the
+    thread and RAM budgets; each job is admitted only when its estimated RAM fits.
+    Databases are kept under disk_budget_gb by evicting the least recently used ones.
+    Per-repository timings are written to codeql_run_report.json and codeql_metrics.prom.
+    With multi_language, each repository gets one cluster database covering all its languages.
     """
+    started_at = time.time()
     databases_dir, codeql_results_dir = create_directories(results_dir)
+    db_cache = DatabaseCache(databases_dir, max_bytes=int(disk_budget_gb * 1024 ** 3) if disk_budget_gb else None)
     df = df.head(num_repos)  # Limit processing to specified number of repositories
+    jobs = {f"{row['repo_owner']}/{row['repo_name']}": {'language': row['language']} for _, row in df.iterrows()}
 
-    with tqdm(total=len(df), desc="Analyzing repositories") as pbar:
-        for _, row in df.iterrows():
-            repo_owner = row['repo_owner']
-            repo_name = row['repo_name']
-            language = row['language']
-
-            # Skip unsupported languages
-            if language not in language_suites:
-                print(f"Skipping {repo_owner}/{repo_name}: Unsupported language {language}")
+    if max_workers <= 1:
+        results = {}
+        with tqdm(total=len(df), desc="Analyzing repositories") as pbar:
+            for _, row in df.iterrows():
+                repo = f"{row['repo_owner']}/{row['repo_name']}"
+                start = time.perf_counter()
+                results[repo] = process_repository(row, base_dir, databases_dir, codeql_results_dir,
+                                                   timeout=timeout, db_cache=db_cache, timings=jobs[repo],
+                                                   multi_language=multi_language)
+                jobs[repo].update(status=results[repo], seconds=round(time.perf_counter() - start, 3))
                 pbar.update(1)
-                continue
+        write_run_report(jobs, results_dir, started_at)
+        return results
 
-            repo_path = os.path.join(base_dir, repo_owner, repo_name)
-            db_name = os.path.join(databases_dir, f"{repo_owner}-{repo_name}-db")
-            result_file = os.path.join(codeql_results_dir, f"{repo_owner}____{repo_name}____results.sarif")
+    total_threads = total_threads or os.cpu_count() or 1
+    total_ram_mb = total_ram_mb or int(total_memory_mb() * 0.8)
+    threads_per_job = max(1, total_threads // max_workers)
+    budget = MemoryBudget(total_ram_mb)
 
-            # Validate repository path
-            if not os.path.exists(repo_path):
-                print(f"Repository path does not exist: {repo_path}")
-                pbar.update(1)
-                continue
+    # Largest repositories first so they do not end up as a long tail
+    if 'size' in df.columns:
+        df = df.sort_values('size', ascending=False, na_position='last')
 
-            # Create the CodeQL database
-            if not create_codeql_database(repo_owner, repo_name, repo_path, db_name, language):
-                pbar.update(1)
-                continue
+    def run_job(row):
+        timings = jobs[f"{row['repo_owner']}/{row['repo_name']}"]
+        start = time.perf_counter()
+        ram_mb = budget.acquire(estimate_job_ram_mb(row))
+        timings['queued_seconds'] = round(time.perf_counter() - start, 3)
+        try:
+            return process_repository(row, base_dir, databases_dir, codeql_results_dir, threads=threads_per_job,
+                                      ram=ram_mb, timeout=timeout, db_cache=db_cache, timings=timings,
+                                      multi_language=multi_language)
+        finally:
+            budget.release(ram_mb)
+            timings['seconds'] = round(time.perf_counter() - start, 3)
 
-            # Analyze the repository
-            if not analyze_repository(repo_owner, repo_name, db_name, result_file, language):
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_job, row): f"{row['repo_owner']}/{row['repo_name']}" for _, row in df.iterrows()}
+        with tqdm(total=len(futures), desc="Analyzing repositories") as pbar:
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"Error processing {futures[future]}: {e}")
+                    results[futures[future]] = 'error'
+                jobs[futures[future]]['status'] = results[futures[future]]
                 pbar.update(1)
-                continue
+    write_run_report(jobs, results_dir, started_at)
+    return results
 
-            pbar.update(1)
+def enqueue_repositories(df, queue_path, num_repos):
+    """
+    Add the first num_repos repositories to the shared queue, largest first.
+    Repositories already in the queue are not added twice.
+    """
+    df = df.head(num_repos)
+    if 'size' in df.columns:
+        df = df.sort_values('size', ascending=False, na_position='last')
+    queue = JobQueue(queue_path)
+    items = ((f"{row['repo_owner']}/{row['repo_name']}", json.loads(row.to_json())) for _, row in df.iterrows())
+    added = queue.enqueue(CODEQL_QUEUE, items)
+    print(f"Queued {added} repositories in {queue_path}: {queue.counts(CODEQL_QUEUE)}")
+    queue.close()
+    return added
 
-def run_analysis(csv_file_path, base_dir, results_dir, num_repos=2):
+def work_repositories(queue_path, base_dir, results_dir, worker_id=None, max_workers=1, total_threads=None,
+                      total_ram_mb=None, timeout=None, disk_budget_gb=None, databases_dir=None, multi_language=False):
+    """
+    Claim repositories from the shared queue until it is drained and analyze them on this node.
+    results_dir must be shared between nodes so the merge step sees every SARIF file;
+    databases_dir may stay on local disk. Each of the max_workers threads claims its own
+    repositories, sharing this node's thread and RAM budgets.
+    """
+    worker_id = worker_id or default_worker_id()
+    local_databases_dir, codeql_results_dir = create_directories(results_dir)
+    databases_dir = databases_dir or local_databases_dir
+    os.makedirs(databases_dir, exist_ok=True)
+    db_cache = DatabaseCache(databases_dir, max_bytes=int(disk_budget_gb * 1024 ** 3) if disk_budget_gb else None)
+    threads_per_job = max(1, (total_threads or os.cpu_count() or 1) // max_workers)
+    budget = MemoryBudget(total_ram_mb or int(total_memory_mb() * 0.8))
+    queue = JobQueue(queue_path)
+
+    def run_job(row):
+        timings = {'language': row['language'], 'worker': worker_id}
+        start = time.perf_counter()
+        ram_mb = budget.acquire(estimate_job_ram_mb(row))
+        timings['queued_seconds'] = round(time.perf_counter() - start, 3)
+        try:
+            timings['status'] = process_repository(row, base_dir, databases_dir, codeql_results_dir,
+                                                   threads=threads_per_job, ram=ram_mb, timeout=timeout,
+                                                   db_cache=db_cache, timings=timings, multi_language=multi_language)
+        finally:
+            budget.release(ram_mb)
+        timings['seconds'] = round(time.perf_counter() - start, 3)
+        return timings
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        processed = sum(executor.map(lambda _: queue.process(CODEQL_QUEUE, worker_id, run_job), range(max_workers)))
+    print(f"Worker {worker_id} analyzed {processed} repositories: {queue.counts(CODEQL_QUEUE)}")
+    queue.close()
+    return processed
+
+def merge_repository_results(queue_path, results_dir):
+    """
+    Build codeql_run_report.json and codeql_metrics.prom from every node's results,
+    in queue order. Returns the statuses dict, or None while repositories are still pending.
+    """
+    queue = JobQueue(queue_path)
+    counts = queue.counts(CODEQL_QUEUE)
+    if counts.get('pending') or counts.get('leased'):
+        print(f"Repositories still in progress, not merging: {counts}")
+        queue.close()
+        return None
+
+    jobs, started_at = {}, None
+    for job in queue.results(CODEQL_QUEUE):
+        started_at = job['created_at'] if started_at is None else min(started_at, job['created_at'])
+        jobs[job['key']] = job['result'] or {'language': job['payload']['language'], 'status': 'error',
+                                             'error': job['error']}
+    queue.close()
+    os.makedirs(results_dir, exist_ok=True)
+    write_run_report(jobs, results_dir, started_at or time.time())
+    return {repo: job['status'] for repo, job in jobs.items()}
+
+def run_analysis(csv_file_path, base_dir, results_dir, num_repos=2, max_workers=1, total_threads=None,
+                 total_ram_mb=None, timeout=None, disk_budget_gb=None, clone_workers=None, url_template=None,
+                 queue_path=None, queue_role='all', worker_id=None, multi_language=False):
     """
     Load the CSV file and start processing repositories for analysis.
+    With clone_workers, missing repositories are cloned (and existing ones updated) first.
+    With queue_path, the work is shared with other nodes through a SQLite job queue:
+    queue_role 'seed' fills it, 'work' analyzes claimed repositories, 'merge' writes the
+    combined report and 'all' does the three in turn.
+    With multi_language, every supported language in a repository is analyzed, not just its `language` column.
     """
     try:
         df = pd.read_csv(csv_file_path)
@@ -125,4 +544,24 @@ def run_analysis(csv_file_path, base_dir, results_dir, num_repos=2):
         print(f"Error loading CSV file: {e}")
         return
 
-    process_repositories(df, base_dir, results_dir, num_repos)
+    # Every worker node clones into its own base_dir; seeding and merging need no clones
+    if clone_workers and (not queue_path or queue_role in ('work', 'all')):
+        os.makedirs(results_dir, exist_ok=True)
+        clone_repositories(load_repo_list(csv_file_path).head(num_repos), base_dir, max_workers=clone_workers,
+                           url_template=url_template, timeout=timeout,
+                           report_file=os.path.join(results_dir, 'clone_report.csv'))
+
+    if queue_path:
+        if queue_role in ('seed', 'all'):
+            enqueue_repositories(df, queue_path, num_repos)
+        if queue_role in ('work', 'all'):
+            work_repositories(queue_path, base_dir, results_dir, worker_id=worker_id, max_workers=max_workers,
+                              total_threads=total_threads, total_ram_mb=total_ram_mb, timeout=timeout,
+                              disk_budget_gb=disk_budget_gb, multi_language=multi_language)
+        if queue_role in ('merge', 'all'):
+            return merge_repository_results(queue_path, results_dir)
+        return None
+
+    return process_repositories(df, base_dir, results_dir, num_repos, max_workers=max_workers,
+                                total_threads=total_threads, total_ram_mb=total_ram_mb, timeout=timeout,
+                                disk_budget_gb=disk_budget_gb, multi_language=multi_language)
@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+KEY_SUFFIX = '.cache-key.json'
+
+def repo_head_sha(repo_path):
+    """
+    Return the HEAD commit SHA of a cloned repository, or None if it cannot be read.
+    """
+    try:
+        result = subprocess.run(['git', '-C', repo_path, 'rev-parse', 'HEAD'],
+                                check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return result.stdout.decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def directory_size(path):
+    """
+    Total size in bytes of all files below a directory.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class DatabaseCache:
+    """
+    Cache of CodeQL artifacts (databases and SARIF results) keyed by repository HEAD SHA
+    and language. The key is stored next to each artifact in a `<path>.cache-key.json`
+    file; databases are evicted least-recently-used first to stay under max_bytes.
+    """
+    def __init__(self, databases_dir, max_bytes=None):
+        self.databases_dir = databases_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._in_use = Counter()
+
+    def _read_key(self, path):
+        try:
+            with open(path + KEY_SUFFIX, 'r', encoding='utf-8') as key_file:
+                return json.load(key_file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_key(self, path, key):
+        tmp_path = path + KEY_SUFFIX + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as key_file:
+            json.dump(key, key_file)
+        os.replace(tmp_path, path + KEY_SUFFIX)
+
+    def is_current(self, path, head_sha, language):
+        """
+        True if the artifact exists and was built from this commit and language.
+        An unknown SHA is never considered current.
+        """
+        if not head_sha or not os.path.exists(path):
+            return False
+        key = self._read_key(path)
+        if not key or key.get('sha') != head_sha or key.get('language') != language:
+            return False
+        key['last_used'] = time.time()
+        self._write_key(path, key)
+        return True
+
+    def record(self, path, head_sha, language):
+        """
+        Store the key of a freshly built artifact.
+        """
+        size = directory_size(path) if os.path.isdir(path) else os.path.getsize(path)
+        self._write_key(path, {'sha': head_sha, 'language': language, 'size': size, 'last_used': time.time()})
+
+    def remove(self, path):
+        """
+        Delete an artifact and its key.
+        """
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path + KEY_SUFFIX):
+            os.remove(path + KEY_SUFFIX)
+
+    @contextmanager
+    def using(self, path):
+        """
+        Protect a database from eviction while it is being built or analyzed.
+        """
+        with self._lock:
+            self._in_use[path] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_use[path] -= 1
+
+    def evict(self):
+        """
+        Remove least recently used databases until the cache fits in max_bytes.
+        """
+        if not self.max_bytes or not os.path.isdir(self.databases_dir):
+            return []
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.databases_dir):
+                if not name.endswith(KEY_SUFFIX):
+                    continue
+                path = os.path.join(self.databases_dir, name[:-len(KEY_SUFFIX)])
+                key = self._read_key(path) or {}
+                entries.append((key.get('last_used', 0), key.get('size', 0), path))
+
+            total = sum(size for _, size, _ in entries)
+            evicted = []
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if self._in_use[path] > 0:
+                    continue
+                self.remove(path)
+                total -= size
+                evicted.append(path)
+        for path in evicted:
+            print(f"Evicted CodeQL database {path}")
+        return evicted
@@ -0,0 +1,132 @@
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from tqdm import tqdm
+from codeql_db_cache import repo_head_sha
+
+# Remote used when a row has no URL of its own; point it at file:// bare repos for local testing
+GITHUB_URL_TEMPLATE = 'https://github.com/{owner}/{repo}.git'
+
+# Never block on a credentials prompt for private or deleted repositories
+GIT_ENV = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+
+def parse_repo_url(url):
+    """
+    Split a repository URL such as https://github.com/owner/repo(.git) into (owner, repo).
+    """
+    parts = url.rstrip('/').split('/')
+    repo = parts[-1][:-4] if parts[-1].endswith('.git') else parts[-1]
+    return parts[-2], repo
+
+def _read_records(path):
+    with open(path, 'r', encoding='utf-8') as input_file:
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in input_file if line.strip()]
+        return json.load(input_file)
+
+def load_repo_list(path):
+    """
+    Load the repositories to clone from sampled_repos.csv or from the
+    3_extensions_with_repository.json(l) stage of the extension collector.
+    Returns a DataFrame with repo_owner, repo_name, url and branch columns.
+    """
+    if path.endswith('.csv'):
+        df = pd.read_csv(path)
+        url = df['html_url'] if 'html_url' in df.columns else None
+        branch = df['default_branch'] if 'default_branch' in df.columns else None
+        repos = pd.DataFrame({
+            'repo_owner': df['repo_owner'],
+            'repo_name': df['repo_name'],
+            'url': url.map(lambda value: f"{value}.git" if isinstance(value, str) else None) if url is not None else None,
+            'branch': branch,
+        })
+    else:
+        rows = []
+        for record in _read_records(path):
+            repository = record.get('repository')
+            if not repository or 'github.com' not in repository:
+                continue
+            owner, repo = parse_repo_url(repository)
+            rows.append({'repo_owner': owner, 'repo_name': repo,
+                         'url': GITHUB_URL_TEMPLATE.format(owner=owner, repo=repo), 'branch': None})
+        repos = pd.DataFrame(rows, columns=['repo_owner', 'repo_name', 'url', 'branch'])
+    return repos.drop_duplicates(subset=['repo_owner', 'repo_name'], ignore_index=True)
+
+def run_git(args, timeout=None):
+    """
+    Run a git command and raise CalledProcessError with its stderr when it fails.
+    """
+    return subprocess.run(['git'] + args, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          env=GIT_ENV, timeout=timeout)
+
+def clone_or_fetch(repo_owner, repo_name, url, base_dir, branch=None, depth=1, timeout=None):
+    """
+    Shallow, blob-filtered clone of a repository into base_dir/owner/repo. An existing
+    clone is updated by fetching only the tip of the branch. Returns a status row with
+    the resulting HEAD SHA.
+    """
+    repo_path = os.path.join(base_dir, repo_owner, repo_name)
+    result = {'repo_owner': repo_owner, 'repo_name': repo_name, 'path': repo_path, 'status': None,
+              'head_sha': None, 'error': None}
+    shallow_flags = [f'--depth={depth}', '--filter=blob:none']
+    try:
+        if os.path.isdir(os.path.join(repo_path, '.git')):
+            previous_sha = repo_head_sha(repo_path)
+            run_git(['-C', repo_path, 'fetch', '--quiet'] + shallow_flags + ['origin', branch or 'HEAD'], timeout)
+            fetched_sha = run_git(['-C', repo_path, 'rev-parse', 'FETCH_HEAD'], timeout).stdout.decode('utf-8').strip()
+            if fetched_sha == previous_sha:
+                result['status'] = 'current'
+            else:
+                run_git(['-C', repo_path, 'reset', '--quiet', '--hard', 'FETCH_HEAD'], timeout)
+                result['status'] = 'updated'
+        else:
+            os.makedirs(os.path.dirname(repo_path), exist_ok=True)
+            branch_flags = ['--branch', branch] if branch else []
+            run_git(['clone', '--quiet', '--single-branch'] + shallow_flags + branch_flags + [url, repo_path], timeout)
+            result['status'] = 'cloned'
+        result['head_sha'] = repo_head_sha(repo_path)
+    except subprocess.TimeoutExpired:
+        result['status'] = 'failed'
+        result['error'] = f'timed out after {timeout}s'
+    except subprocess.CalledProcessError as e:
+        result['status'] = 'failed'
+        result['error'] = e.stderr.decode('utf-8', errors='replace').strip()
+    return result
+
+def clone_repositories(repos, base_dir, max_workers=8, url_template=None, depth=1, timeout=None, report_file=None):
+    """
+    Clone or update every repository in the DataFrame in parallel, at most max_workers
+    git processes at a time. With url_template (e.g. 'file:///srv/mirrors/{owner}/{repo}.git')
+    the remote URL is built from it instead of the url column.
+    Returns a DataFrame with the status and HEAD SHA of each repository.
+    """
+    def row_url(row):
+        if url_template:
+            return url_template.format(owner=row['repo_owner'], repo=row['repo_name'])
+        url = row.get('url')
+        return url if isinstance(url, str) else GITHUB_URL_TEMPLATE.format(owner=row['repo_owner'], repo=row['repo_name'])
+
+    def row_branch(row):
+        branch = row.get('branch')
+        return branch if isinstance(branch, str) and branch else None
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(clone_or_fetch, row['repo_owner'], row['repo_name'], row_url(row), base_dir,
+                            row_branch(row), depth, timeout)
+            for _, row in repos.iterrows()
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Cloning repositories"):
+            result = future.result()
+            if result['status'] == 'failed':
+                print(f"Error cloning {result['repo_owner']}/{result['repo_name']}: {result['error']}")
+            results.append(result)
+
+    report = pd.DataFrame(results, columns=['repo_owner', 'repo_name', 'path', 'status', 'head_sha', 'error'])
+    if report_file:
+        report.to_csv(report_file, index=False)
+        print(f"Clone report saved to {report_file}")
+    return report
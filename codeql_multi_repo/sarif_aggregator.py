@@ -0,0 +1,187 @@
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+try:
+    import ijson
+except ImportError:  # ijson is in requirements.txt; without it each SARIF file is loaded whole (aggregate_sarif warns)
+    ijson = None
+
+FINDING_COLUMNS = ['repo', 'language', 'rule_id', 'severity', 'security_severity', 'cwe', 'file', 'line']
+CATEGORY_COLUMNS = ['repo', 'language', 'rule_id', 'severity', 'cwe']
+
+# CodeQL rule ids start with a language prefix, e.g. js/xss or py/sql-injection
+RULE_LANGUAGE_PREFIXES = {
+    'js': 'javascript',
+    'py': 'python',
+    'go': 'go',
+    'java': 'java',
+    'cpp': 'cpp',
+    'cs': 'csharp',
+    'rb': 'ruby',
+    'swift': 'swift',
+}
+
+def repo_from_filename(path):
+    """
+    Recover `owner/repo` from a `{owner}____{repo}____...results.sarif` file name.
+    """
+    parts = os.path.basename(path).split('____')
+    return f"{parts[0]}/{parts[1]}" if len(parts) >= 3 else os.path.basename(path)
+
+def rule_language(rule_id):
+    """
+    Language of a CodeQL rule, taken from its id prefix.
+    """
+    prefix = (rule_id or '').split('/', 1)[0]
+    return RULE_LANGUAGE_PREFIXES.get(prefix, prefix or None)
+
+def _walk(node, keys):
+    if not keys:
+        yield node
+        return
+    key, rest = keys[0], keys[1:]
+    if key == 'item':
+        for child in node or []:
+            yield from _walk(child, rest)
+    elif isinstance(node, dict) and key in node:
+        yield from _walk(node[key], rest)
+
+def iter_run_items(path, prefix):
+    """
+    Yield (run index, object) pairs for an ijson-style prefix relative to each run,
+    such as `tool` or `results.item`, streaming the file when ijson is installed.
+    """
+    with open(path, 'rb') as sarif_file:
+        if ijson is None:
+            for run_index, run in enumerate(json.load(sarif_file).get('runs') or []):
+                for item in _walk(run, prefix.split('.')):
+                    yield run_index, item
+            return
+
+        run_position = [-1]
+        def events():
+            for event_prefix, event, value in ijson.parse(sarif_file):
+                if event_prefix == 'runs.item' and event == 'start_map':
+                    run_position[0] += 1
+                yield event_prefix, event, value
+        for item in ijson.items(events(), f'runs.item.{prefix}'):
+            yield run_position[0], item
+
+def rule_metadata(rule):
+    """
+    Severity, security severity and CWE ids of a SARIF reportingDescriptor.
+    """
+    properties = rule.get('properties', {})
+    cwes = sorted(tag.split('/')[-1].upper() for tag in properties.get('tags', []) if '/cwe/' in tag)
+    return {
+        'id': rule.get('id'),
+        'severity': properties.get('problem.severity'),
+        'security_severity': properties.get('security-severity'),
+        'cwe': ','.join(cwes),
+    }
+
+def parse_sarif(path):
+    """
+    Extract one finding row per result in a SARIF file.
+    """
+    repo = repo_from_filename(path)
+
+    # Rule metadata (severity and CWE tags) is small, so it is collected first. CodeQL query
+    # packs put the rules in tool.extensions rather than tool.driver, and results point to
+    # them with rule.toolComponent.index (an index into extensions) and rule.index
+    rules_by_index = {}
+    rules_by_id = {}
+    for run_index, tool in iter_run_items(path, 'tool'):
+        components = [(None, tool.get('driver') or {})] + list(enumerate(tool.get('extensions') or []))
+        for component_index, component in components:
+            for rule_index, rule in enumerate(component.get('rules') or []):
+                metadata = rule_metadata(rule)
+                rules_by_index[(run_index, component_index, rule_index)] = metadata
+                rules_by_id.setdefault(metadata['id'], metadata)
+
+    rows = []
+    for run_index, result in iter_run_items(path, 'results.item'):
+        reference = result.get('rule') or {}
+        rule = None
+        if reference.get('index') is not None:
+            component_index = (reference.get('toolComponent') or {}).get('index')
+            rule = rules_by_index.get((run_index, component_index, reference['index']))
+        elif result.get('ruleIndex') is not None:
+            rule = rules_by_index.get((run_index, None, result['ruleIndex']))
+        rule_id = result.get('ruleId') or reference.get('id') or (rule or {}).get('id')
+        rule = rule or rules_by_id.get(rule_id, {})
+        location = (result.get('locations') or [{}])[0].get('physicalLocation', {})
+        security_severity = rule.get('security_severity')
+        rows.append((
+            repo,
+            rule_language(rule_id),
+            rule_id,
+            result.get('level') or rule.get('severity'),
+            float(security_severity) if security_severity is not None else None,
+            rule.get('cwe', ''),
+            location.get('artifactLocation', {}).get('uri'),
+            location.get('region', {}).get('startLine'),
+        ))
+    return rows
+
+def compact_findings(df):
+    """
+    Use categorical columns for the repeated string fields and a nullable integer line.
+    """
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+    df['security_severity'] = df['security_severity'].astype('float32')
+    df['line'] = df['line'].astype('Int32')
+    return df
+
+def aggregate_sarif(results_dir, output_file=None, max_workers=None):
+    """
+    Parse every SARIF file in results_dir in parallel and return a single findings table.
+    The table is also written to output_file (.parquet or .csv) when given.
+    """
+    # Imported here so the parse_sarif worker processes never load pandas
+    import pandas as pd
+
+    paths = sorted(glob.glob(os.path.join(results_dir, '*.sarif')))
+    if ijson is None:
+        print("Warning: ijson is not installed, so every SARIF file is loaded whole instead of streamed "
+              "(pip install -r requirements.txt)")
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for file_rows in tqdm(executor.map(parse_sarif, paths, chunksize=4), total=len(paths), desc="Aggregating SARIF"):
+            rows.extend(file_rows)
+
+    df = compact_findings(pd.DataFrame(rows, columns=FINDING_COLUMNS))
+    if output_file:
+        if output_file.endswith('.parquet'):
+            df.to_parquet(output_file, index=False)
+        else:
+            df.to_csv(output_file, index=False)
+        print(f"Findings table saved to {output_file}")
+    return df
+
+def findings_per_rule(df):
+    """
+    Number of findings and affected repositories for each rule, most frequent first.
+    """
+    summary = df.groupby(['rule_id', 'severity', 'cwe'], observed=True).agg(
+        findings=('repo', 'size'),
+        repos=('repo', 'nunique'),
+        max_security_severity=('security_severity', 'max'),
+    )
+    return summary.reset_index().sort_values('findings', ascending=False, ignore_index=True)
+
+def findings_per_repo(df):
+    """
+    Number of findings, distinct rules and high-severity findings (>= 7.0) for each repository.
+    """
+    summary = df.assign(high=df['security_severity'] >= 7.0).groupby('repo', observed=True).agg(
+        findings=('rule_id', 'size'),
+        rules=('rule_id', 'nunique'),
+        high_severity=('high', 'sum'),
+        languages=('language', lambda languages: ','.join(sorted(set(languages.dropna())))),
+    )
+    return summary.reset_index().sort_values('findings', ascending=False, ignore_index=True)
@@ -1,104 +1,81 @@
-import requests
+import os
+import sys
 import json
- 
- 
 
-def fetch_vscode_extensions(search_terms, max_results):
+# The HTTP transport, the paged crawler and the extension record are shared with the main collector
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data_collection_benjamin'))
+from concurrent_enricher import ConcurrentEnricher
+from http_transport import HttpTransport
+from marketplace_crawler import MarketplaceCrawler, extension_id
+from records import ExtensionRecord
+
+# Shared transport: keep-alive connections, timeouts and retries with backoff behave as in the main collector
+TRANSPORT = HttpTransport()
+
+
+def project_extension(ext):
+    """
+    Reduce a raw API extension to the exported fields (publisher_name, ext_name,
+    link_to_extension and statistics), parsed by ExtensionRecord.from_api.
+    """
+    record = ExtensionRecord.from_api(ext)
+    return {
+        "publisher_name": record.publisher_name,  # Name of the publisher of the extension
+        "ext_name": record.ext_name,  # Name of the extension
+        # Build the direct link to the Marketplace
+        "link_to_extension": f"https://marketplace.visualstudio.com/items?itemName={record.full_name}",
+        "downloads": int(record.install_count),  # Total number of installs (download count)
+        "average_rating": record.average_rating,
+        "rating_count": record.rating_count,
+        "update_count": record.update_count,
+        "trending_daily": record.trending_daily,
+        "trending_weekly": record.trending_weekly,
+        "trending_monthly": record.trending_monthly,
+        "trending_overall": record.trending_overall,
+    }
+
+
+def fetch_vscode_extensions(search_terms, max_results, max_workers=8, http_cache=None):
     """
     Fetch VSCode extensions based on a list of search terms and extract specific data 
     (publisher_name, ext_name, link_to_extension, downloads, ratings, trends, and install stats).
+    Pages are requested by MarketplaceCrawler: the first page of every term is fetched in parallel;
+    it carries the exact total, so the remaining pages are then requested concurrently.
+    Extensions returned by several terms are kept once.
     
     Args:
         search_terms (list): List of search terms to query extensions.
         max_results (int): Maximum number of extensions to fetch per term.
+        max_workers (int): Maximum number of concurrent requests.
+        http_cache (HttpCache, optional): On-disk cache shared with the main collector.
     
     Returns:
         list: List of dictionaries containing publisher_name, ext_name, link_to_extension,
               and statistics such as downloads, average_rating, rating_count, and trending values.
     """
-    url = "https://marketplace.visualstudio.com/_apis/public/gallery/extensionquery"
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json;api-version=3.0-preview.1"
-    }
-
-    page_size = 50  # API allows up to 50 extensions per page
-    all_results = []
-
-    for term in search_terms:
-        term = term.strip()
-        if not term:
-            term = ""
-
-        page_number = 1
-        results = []
-
-        while len(results) < max_results:
-            payload = {
-                "filters": [{
-                    "criteria": [{"filterType": 10, "value": term}],
-                    "pageNumber": page_number,
-                    "pageSize": page_size,
-                    "sortBy": 0,
-                    "sortOrder": 0
-                }],
-                "flags": 914
-            }
-
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
-
-            if response.status_code == 200:
-                data = response.json()
-                extensions = data.get("results", [])[0].get("extensions", [])
-                if not extensions:
-                    break
-                results.extend(extensions)
-                page_number += 1
-            else:
-                break
-
-        # Limit results per term to max_results
-        results = results[:max_results]
-        for ext in results:
-            ext["Search Term"] = term  # Add search term for grouping later
-        all_results.extend(results)
+    terms = list(dict.fromkeys(term.strip() for term in search_terms))
+    send = TRANSPORT.request
+    if http_cache is not None:
+        send = lambda method, url, **kwargs: http_cache.request(TRANSPORT.request, method, url, **kwargs)
+    # API allows up to 50 extensions per page; results are ranked by relevance to the search text
+    crawler = MarketplaceCrawler(send=send, enricher=ConcurrentEnricher(max_workers=max_workers, per_host_limit=max_workers),
+                                 page_size=50, flags=914, sort_by=0)
+
+    # Raw API objects are reduced to the exported row as soon as each page arrives
+    results_per_term = [[] for _ in terms]
+    shards = [[{"filterType": 10, "value": term}] for term in terms]
+    for index, extensions in crawler.iter_pages(shards, max_results=max_results):
+        results_per_term[index].extend((extension_id(ext), project_extension(ext)) for ext in extensions)
 
-    if not all_results:
-        return []
-
-    # Extract only the required data: publisher_name, ext_name, and link_to_extension
     extensions_data = []
-    for ext in all_results:
-        publisher_name = ext["publisher"].get("publisherName", "N/A") if "publisher" in ext else "N/A"
-        ext_name = ext.get("extensionName", "N/A")
-
-        # Build the direct link to the Marketplace
-        link_to_extension = f"https://marketplace.visualstudio.com/items?itemName={publisher_name}.{ext_name}"
-
-        # Extract statistics
-        downloads = next((stat["value"] for stat in ext["statistics"] if stat["statisticName"] == "install"), 0)
-        avg_rating = next((stat["value"] for stat in ext["statistics"] if stat["statisticName"] == "averagerating"), 0)
-        rating_count = next((stat["value"] for stat in ext["statistics"] if stat["statisticName"] == "ratingcount"), 0)
-        update_count = next((stat["value"] for stat in ext["statistics"] if stat["statisticName"] == "updateCount"), 0)
-        trending_daily = next((stat["value"] for stat in ext["statistics"] if stat["statisticName"] == "trendingdaily"), 0)
-        trending_weekly = next((stat["value"] for stat in ext["statistics"] if stat["statisticName"] == "trendingweekly"), 0)
-        trending_monthly = next((stat["value"] for stat in ext["statistics"] if stat["statisticName"] == "trendingmonthly"), 0)
-        trending_overall = next((stat["value"] for stat in ext["statistics"] if stat["statisticName"] == "trendingOverall"), 0)
-
-        # Append the collected data
-        extensions_data.append({
-            "publisher_name": publisher_name,  # Name of the publisher of the extension
-            "ext_name": ext_name,  # Name of the extension
-            "link_to_extension": link_to_extension,  # Direct link to the Marketplace page
-            "downloads": int(downloads),  # Total number of installs (download count)
-            "average_rating": avg_rating,  # Average user rating
-            "rating_count": rating_count,  # Total number of ratings
-            "update_count": update_count,  # Number of updates for the extension
-            "trending_daily": trending_daily,  # Daily trending value
-            "trending_weekly": trending_weekly,  # Weekly trending value
-            "trending_monthly": trending_monthly,  # Monthly trending value
-            "trending_overall": trending_overall  # Overall trending score
-        })
+    seen = set()
+    for results in results_per_term:
+        # Limit results per term to max_results
+        for key, row in results[:max_results]:
+            if key in seen:
+                continue
+            seen.add(key)
+            extensions_data.append(row)
 
     return extensions_data
 
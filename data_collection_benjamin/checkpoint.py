@@ -0,0 +1,37 @@
+import json
+import os
+import threading
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def completed(self):
+        # La última línea de cada clave gana: un fallo reintentado con éxito queda como completado
+        entries = {}
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as log_file:
+            for line in log_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Línea incompleta por una interrupción durante la escritura
+                    continue
+                entries[entry["key"]] = entry
+        return {key: entry.get("record") for key, entry in entries.items() if entry["status"] == "ok"}
+
+    def record(self, key, record):
+        entry = {"key": key, "status": "ok" if record else "failed", "record": record or None}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as log_file:
+                log_file.write(line)
+                log_file.flush()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
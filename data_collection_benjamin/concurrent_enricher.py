@@ -0,0 +1,75 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from tqdm import tqdm
+
+
+class HostLimiter:
+    def __init__(self, per_host_limit=4):
+        self.per_host_limit = per_host_limit
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+    @contextmanager
+    def limit(self, url):
+        # Limita las solicitudes simultáneas hacia un mismo host
+        with self._semaphore(url):
+            yield
+
+
+class ConcurrentEnricher:
+    def __init__(self, max_workers=8, per_host_limit=4):
+        self.max_workers = max_workers
+        self.host_limiter = HostLimiter(per_host_limit)
+
+    def map(self, func, items, desc="Procesando", unit="ext"):
+        items = list(items)
+        results = [None] * len(items)
+
+        if self.max_workers <= 1:
+            for index, item in enumerate(tqdm(items, desc=desc, unit=unit, disable=desc is None)):
+                results[index] = self._call(func, item)
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._call, func, item): index for index, item in enumerate(items)}
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc, unit=unit, disable=desc is None):
+                # Los resultados se guardan según su posición original
+                results[futures[future]] = future.result()
+
+        return results
+
+    def imap(self, func, items, window=None):
+        # Entrega pares (item, resultado) en orden de entrada con un número acotado de tareas en curso
+        window = window or self.max_workers * 4
+        if self.max_workers <= 1:
+            for item in items:
+                yield item, self._call(func, item)
+            return
+
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for item in items:
+                in_flight.append((item, executor.submit(self._call, func, item)))
+                if len(in_flight) >= window:
+                    item, future = in_flight.popleft()
+                    yield item, future.result()
+            while in_flight:
+                item, future = in_flight.popleft()
+                yield item, future.result()
+
+    def _call(self, func, item):
+        try:
+            return func(item)
+        except Exception as e:
+            print(f"Excepción al procesar {item}: {e}")
+            return None
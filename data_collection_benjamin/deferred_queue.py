@@ -0,0 +1,31 @@
+import heapq
+import itertools
+import random
+import time
+
+
+class DeferredQueue:
+    def __init__(self, base_delay=15, max_delay=300, max_attempts=6):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self._heap = []
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item, attempt=0):
+        # Espera exponencial con algo de variación para no reintentar todo al mismo tiempo
+        delay = min(self.base_delay * 2 ** attempt, self.max_delay) * random.uniform(0.8, 1.2)
+        heapq.heappush(self._heap, (time.time() + delay, next(self._counter), attempt, item))
+
+    def pop_ready(self):
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, attempt, item = heapq.heappop(self._heap)
+            yield item, attempt
+
+    def wait_next(self):
+        if self._heap:
+            time.sleep(max(self._heap[0][0] - time.time(), 0))
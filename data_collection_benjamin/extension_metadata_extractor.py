@@ -1,76 +1,73 @@
 import os
-import requests
-import json
-from tqdm import tqdm
-from file_handler import FileHandler
+from checkpoint import Checkpoint
+from concurrent_enricher import ConcurrentEnricher
+from extension_store import ExtensionStore
+from file_handler import FileHandler, chunked, extension_key
+from http_cache import HttpCache
+from http_transport import HttpTransport
+from incremental import Snapshot
+from job_queue import default_worker_id
+from line_counter import LineCounter
+from marketplace_crawler import MarketplaceCrawler
+from metrics import Metrics
+from records import ExtensionRecord
+from vsix_analyzer import VsixAnalyzer, VsixCache
 from github_metadata_fetcher import GitHubMetadataFetcher
 
 class ExtensionMetadataExtractor:
-    def __init__(self, github_token):
+    def __init__(self, github_token, max_workers=8, per_host_limit=4, github_backend="graphql", clones_dir=None,
+                 data_dir=None):
         self.github_token = github_token
-        self.data_dir = os.path.join(os.path.dirname(__file__), "data")
+        self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), "data")
         os.makedirs(self.data_dir, exist_ok=True)
-        self.file_handler = FileHandler()
-        self.github_fetcher = GitHubMetadataFetcher(github_token)
+        self.checkpoint_dir = os.path.join(self.data_dir, "checkpoints")
+        self.metrics = Metrics()
+        self.file_handler = FileHandler(extra_formats=("csv", "parquet"), metrics=self.metrics)
+        self.store = ExtensionStore(os.path.join(self.data_dir, "extensions.db"))
+        self.http_cache = HttpCache(os.path.join(self.data_dir, "cache"), metrics=self.metrics)
+        # Todas las solicitudes comparten el mismo pool de conexiones
+        self.transport = HttpTransport(pool_size=max_workers * 2, metrics=self.metrics)
+        line_counter = LineCounter(cache_dir=os.path.join(self.data_dir, "line_counts")) if clones_dir else None
+        self.github_fetcher = GitHubMetadataFetcher(
+            github_token, backend=github_backend, http_cache=self.http_cache,
+            line_counter=line_counter, clones_dir=clones_dir, transport=self.transport
+        )
+        self.enricher = ConcurrentEnricher(max_workers=max_workers, per_host_limit=per_host_limit)
+        self.vsix_analyzer = VsixAnalyzer(
+            VsixCache(os.path.join(self.data_dir, "vsix"), send=self.transport.request), enricher=self.enricher
+        )
+        self.crawler = MarketplaceCrawler(
+            send=lambda method, url, **kwargs: self.http_cache.request(self.transport.request, method, url, **kwargs),
+            enricher=self.enricher
+        )
+        self._prefetched = {}
+        self.snapshot = None
+        self.queue_name = "extensions"
 
     def fetch_extensions(self, max_results=50):
-        url = "https://marketplace.visualstudio.com/_apis/public/gallery/extensionquery"
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json;api-version=3.0-preview.1"
-        }
-        extensions_data = []
-        page_number = 1
-        page_size = 54
-
-        while len(extensions_data) < max_results:
-            payload = {
-                "filters": [{
-                    "criteria": [
-                        {"filterType": 8, "value": "Microsoft.VisualStudio.Code"},
-                        {"filterType": 10, "value": 'target:"Microsoft.VisualStudio.Code"'},
-                        {"filterType": 12, "value": "37888"}
-                    ],
-                    "pageNumber": page_number,
-                    "pageSize": page_size,
-                    "sortBy": 4,
-                    "sortOrder": 0
-                }],
-                "flags": 870
-            }
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
+        return list(self.iter_extensions(max_results=max_results))
 
-            if response.status_code == 200:
-                data = response.json()
-                extensions = data.get("results", [])[0].get("extensions", [])
-
-                if not extensions:
-                    print(f"No hay más extensiones disponibles.")
-                    break
-
-                for ext in extensions:
-                    if len(extensions_data) >= max_results:
-                        break
-                    publisher_name = ext.get("publisher", {}).get("publisherName", "N/A")
-                    ext_name = ext.get("extensionName", "N/A")
-                    link_to_extension = f"https://marketplace.visualstudio.com/items?itemName={publisher_name}.{ext_name}"
-
-                    extensions_data.append({
-                        "publisher_name": publisher_name,
-                        "ext_name": ext_name,
-                        "link_to_extension": link_to_extension
-                    })
-
-                page_number += 1
-            else:
-                print(f"Error en la solicitud: {response.status_code} - {response.text}")
-                break
+    def iter_extensions(self, max_results=50):
+        # max_results=None recorre todo el catálogo repartido por categorías
+        if max_results is None:
+            extensions = self.crawler.crawl_catalog()
+        else:
+            extensions = self.crawler.crawl(max_results=max_results)
+
+        for ext in extensions:
+            publisher_name = ext.get("publisher", {}).get("publisherName", "N/A")
+            ext_name = ext.get("extensionName", "N/A")
+            link_to_extension = f"https://marketplace.visualstudio.com/items?itemName={publisher_name}.{ext_name}"
+            yield {
+                "publisher_name": publisher_name,
+                "ext_name": ext_name,
+                "link_to_extension": link_to_extension
+            }
 
-        return extensions_data
-    
     def fetch_manifest_data(self, manifest_url):
         try:
-            response = requests.get(manifest_url)
+            with self.enricher.host_limiter.limit(manifest_url):
+                response = self.http_cache.request(self.transport.request, "GET", manifest_url)
             if response.status_code == 200:
                 manifest = response.json()
                 return {
@@ -82,7 +79,7 @@ class ExtensionMetadataExtractor:
             print(f"Error al obtener el manifiesto desde {manifest_url}: {e}")
         return {"repositories": "N/A", "tags": "N/A", "categories": "N/A"}
 
-    def fetch_extension_metadata(self, publisher_name, ext_name):
+    def query_extensions(self, full_names):
         url = "https://marketplace.visualstudio.com/_apis/public/gallery/extensionquery"
         headers = {
             "Content-Type": "application/json",
@@ -91,87 +88,274 @@ class ExtensionMetadataExtractor:
         payload = {
             "filters": [
                 {
-                    "criteria": [
-                        {"filterType": 7, "value": f"{publisher_name}.{ext_name}"}
-                    ]
+                    "criteria": [{"filterType": 7, "value": name} for name in full_names],
+                    "pageNumber": 1,
+                    "pageSize": len(full_names)
                 }
             ],
             "flags": 914
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        with self.enricher.host_limiter.limit(url):
+            response = self.http_cache.request(self.transport.request, "POST", url, headers=headers, json=payload)
         if response.status_code == 200:
             data = response.json()
-            extensions = data.get("results", [])[0].get("extensions", [])
-            if extensions:
-                ext = extensions[0]
-
-                # Obtener toda la metadata posible
-                properties = ext.get("versions", [{}])[0].get("properties", [])
-                repository_url = "N/A"
-                for prop in properties:
-                    if prop.get("key", "").lower() == "repositoryuri":
-                        repository_url = prop.get("value", "N/A")
-                        break
-
-                # Obtener URL del manifiesto
-                manifest_url = next(
-                    (file["source"] for file in ext.get("versions", [{}])[0].get("files", [])
-                     if file["assetType"] == "Microsoft.VisualStudio.Code.Manifest"),
-                    "N/A"
-                )
-
-                # Extraer datos del manifiesto
-                manifest_data = self.fetch_manifest_data(manifest_url) if manifest_url != "N/A" else {}
-
-                # Obtener estadísticas
-                statistics = ext.get("statistics", [])
-                install_count = next((stat["value"] for stat in statistics if stat["statisticName"] == "install"), 0)
-                average_rating = next((stat["value"] for stat in statistics if stat["statisticName"] == "averagerating"), 0)
-                rating_count = next((stat["value"] for stat in statistics if stat["statisticName"] == "ratingcount"), 0)
-
-                # Obtener métricas de código
-                repo_name = repository_url.split('/')[-1]
-                owner = repository_url.split('/')[-2]
-
-                metadata = {
-                    "publisher_name": ext.get("publisher", {}).get("publisherName", "N/A"),
-                    "extension_name": ext.get("extensionName", "N/A"),
-                    "display_name": ext.get("displayName", "N/A"),
-                    "description": ext.get("shortDescription", "N/A"),
-                    "last_updated": ext.get("lastUpdated", "N/A"),
-                    "version": ext.get("versions", [{}])[0].get("version", "N/A"),
-                    "tags": manifest_data.get("tags", "N/A"),
-                    "categories": manifest_data.get("categories", "N/A"),
-                    "install_count": install_count,
-                    "average_rating": average_rating,
-                    "rating_count": rating_count,
-                    "repository": manifest_data.get("repositories", repository_url),
-                    "icon_url": ext.get("versions", [{}])[0].get("files", [{}])[0].get("source", "N/A"),
-                }
-                return metadata
+            extensions = data.get("results", [{}])[0].get("extensions", [])
+            # Se guarda solo el registro compacto, no la respuesta completa
+            records = (ExtensionRecord.from_api(ext) for ext in extensions)
+            return {record.full_name.lower(): record for record in records}
+        print(f"Error en la solicitud: {response.status_code} - {response.text}")
         return {}
 
-    def run(self, max_results=50):
-        extensions = self.fetch_extensions(max_results=max_results)
+    def prefetch_extension_metadata(self, extensions, batch_size=50):
+        # Resolver varias extensiones por consulta en lugar de una solicitud por extensión
+        full_names = [f"{ext['publisher_name']}.{ext['ext_name']}" for ext in extensions]
+        batches = [full_names[i:i + batch_size] for i in range(0, len(full_names), batch_size)]
+        for found in self.enricher.map(self.query_extensions, batches, desc=None):
+            if found:
+                self._prefetched.update(found)
+
+    def iter_prefetched(self, extensions, completed=(), batch_size=50):
+        # Agrupa el flujo en bloques para resolver sus lotes en paralelo antes de entregarlos
+        for chunk in chunked(extensions, batch_size * self.enricher.max_workers):
+            self.prefetch_extension_metadata([ext for ext in chunk if extension_key(ext) not in completed], batch_size)
+            yield from chunk
 
-        if extensions:
-            initial_json = os.path.join(self.data_dir, "1_extensions_initial.json")
-            self.file_handler.save_to_json(extensions, initial_json)
+    def fetch_extension_metadata(self, publisher_name, ext_name):
+        full_name = f"{publisher_name}.{ext_name}"
+        record = self._prefetched.pop(full_name.lower(), None)
+        if record is None:
+            # Consulta individual solo para las extensiones que no vinieron en los lotes
+            record = self.query_extensions([full_name]).get(full_name.lower())
+
+        if record:
+            # En modo incremental, el manifiesto solo se descarga si la extensión cambió
+            previous = None
+            if self.snapshot is not None:
+                previous = self.snapshot.unchanged_metadata(full_name, record.version, record.last_updated)
+
+            # Extraer datos del manifiesto
+            if previous:
+                manifest_data = {"tags": previous["tags"], "categories": previous["categories"], "repositories": previous["repository"]}
+            else:
+                manifest_data = self.fetch_manifest_data(record.manifest_url) if record.manifest_url != "N/A" else {}
 
-            final_json = os.path.join(self.data_dir, "2_extensions_with_metadata.json")
-            self.file_handler.append_metadata_to_json(initial_json, final_json, self.fetch_extension_metadata)
+            return {
+                "publisher_name": record.publisher_name,
+                "extension_name": record.ext_name,
+                "display_name": record.display_name,
+                "description": record.description,
+                "last_updated": record.last_updated,
+                "version": record.version,
+                "tags": manifest_data.get("tags", "N/A"),
+                "categories": manifest_data.get("categories", "N/A"),
+                "install_count": record.install_count,
+                "average_rating": record.average_rating,
+                "rating_count": record.rating_count,
+                "repository": manifest_data.get("repositories", record.repository_url),
+                "icon_url": record.icon_url,
+                "vsix_url": record.vsix_url,
+            }
+        return {}
 
-            repo_json = os.path.join(self.data_dir, "3_extensions_with_repository.json")
-            self.file_handler.filter_extensions_with_github_repository(final_json, repo_json)
+    def run(self, max_results=50, resume=False, incremental=False, analyze_packages=False):
+        initial_json = os.path.join(self.data_dir, "1_extensions_initial.jsonl")
+        final_json = os.path.join(self.data_dir, "2_extensions_with_metadata.jsonl")
+        repo_json = os.path.join(self.data_dir, "3_extensions_with_repository.jsonl")
+        github_json = os.path.join(self.data_dir, "4_github_metadata.jsonl")
+        packages_json = os.path.join(self.data_dir, "5_vsix_package_metrics.jsonl")
+        self.metrics.reset()
+        metadata_checkpoint = Checkpoint(os.path.join(self.checkpoint_dir, "2_extensions_with_metadata.log"))
+        github_checkpoint = Checkpoint(os.path.join(self.checkpoint_dir, "4_github_metadata.log"))
 
-            github_json = os.path.join(self.data_dir, "4_github_metadata.json")
-            self.github_fetcher.extract_github_metadata_to_json(repo_json, github_json)
+        # La ejecución anterior sirve como referencia para refrescar solo lo que cambió
+        self.snapshot = Snapshot(final_json, github_json) if incremental else None
 
-            json_files = [initial_json, final_json, repo_json, github_json]
+        # Una ejecución interrumpida deja los .tmp de las etapas que no llegaron a cerrarse
+        for stage_json in (initial_json, final_json, repo_json, github_json, packages_json):
+            self.file_handler.remove_partial(stage_json)
+        if not resume:
+            metadata_checkpoint.clear()
+            github_checkpoint.clear()
 
-            for json_file in json_files:
-                csv_file = json_file.replace(".json", ".csv")
-                self.file_handler.json_to_csv(json_file, csv_file)
+        if resume and os.path.exists(initial_json):
+            # Reutilizar la lista inicial para que las claves del checkpoint coincidan
+            extensions = self.file_handler.iter_records(initial_json)
         else:
-            print("No se encontraron extensiones.")
\ No newline at end of file
+            # Si la interrupción fue durante la etapa 1 se vuelve a rastrear; los checkpoints
+            # se conservan porque sus claves son publisher.extensión y no dependen del orden
+            extensions = self.store.tee(self.file_handler.write_records(self.iter_extensions(max_results=max_results), initial_json), stage=1)
+        if self.snapshot is not None:
+            extensions = self.snapshot.listed(extensions)
+
+        # Cada etapa consume los registros de la anterior a medida que se producen
+        # y los guarda tanto en su archivo como en la base SQLite
+        completed = metadata_checkpoint.completed()
+        extensions = self.store.tee(
+            self.file_handler.write_records(
+                self.file_handler.enrich_with_metadata(
+                    self.iter_prefetched(extensions, completed), self.fetch_extension_metadata,
+                    enricher=self.enricher, checkpoint=metadata_checkpoint
+                ),
+                final_json
+            ),
+            stage=2
+        )
+        extensions = self.file_handler.write_records(self.file_handler.iter_github_extensions(extensions), repo_json)
+        carry_forward = self.snapshot.unchanged_github if self.snapshot is not None else None
+        self.file_handler.save_records(
+            self.store.tee(
+                self.github_fetcher.iter_github_metadata(extensions, checkpoint=github_checkpoint, carry_forward=carry_forward),
+                stage=4
+            ),
+            github_json
+        )
+
+        if analyze_packages:
+            # Los paquetes se analizan a partir de la etapa 2 ya guardada
+            self.file_handler.save_records(
+                self.store.tee(self.vsix_analyzer.iter_package_metrics(self.file_handler.iter_records(final_json)), stage=5),
+                packages_json
+            )
+
+        if self.snapshot is not None:
+            self.file_handler.save_records(self.snapshot.removed(), os.path.join(self.data_dir, "removed_extensions.jsonl"))
+            print(f"Resumen incremental: {self.snapshot.summary()}")
+
+        self.finish()
+
+    def finish(self):
+        if self.github_fetcher.line_counter is not None:
+            self.github_fetcher.line_counter.close()
+        self.metrics.export(os.path.join(self.data_dir, "run_report.json"), os.path.join(self.data_dir, "run_metrics.prom"))
+
+    # Etapas sueltas: cada una lee el archivo de la anterior, para ejecutarlas por separado desde la línea de comandos
+    def run_crawl(self, max_results=50):
+        self.metrics.reset()
+        self.file_handler.save_records(
+            self.store.tee(self.iter_extensions(max_results=max_results), stage=1),
+            os.path.join(self.data_dir, "1_extensions_initial.jsonl")
+        )
+        self.finish()
+
+    def run_enrich(self, resume=False):
+        self.metrics.reset()
+        checkpoint = Checkpoint(os.path.join(self.checkpoint_dir, "2_extensions_with_metadata.log"))
+        if not resume:
+            checkpoint.clear()
+        extensions = self.file_handler.iter_records(os.path.join(self.data_dir, "1_extensions_initial.jsonl"))
+        extensions = self.store.tee(
+            self.file_handler.write_records(
+                self.file_handler.enrich_with_metadata(
+                    self.iter_prefetched(extensions, checkpoint.completed()), self.fetch_extension_metadata,
+                    enricher=self.enricher, checkpoint=checkpoint
+                ),
+                os.path.join(self.data_dir, "2_extensions_with_metadata.jsonl")
+            ),
+            stage=2
+        )
+        self.file_handler.save_records(
+            self.file_handler.iter_github_extensions(extensions),
+            os.path.join(self.data_dir, "3_extensions_with_repository.jsonl")
+        )
+        self.finish()
+
+    def run_github(self, resume=False):
+        self.metrics.reset()
+        checkpoint = Checkpoint(os.path.join(self.checkpoint_dir, "4_github_metadata.log"))
+        if not resume:
+            checkpoint.clear()
+        extensions = self.file_handler.iter_records(os.path.join(self.data_dir, "3_extensions_with_repository.jsonl"))
+        self.file_handler.save_records(
+            self.store.tee(self.github_fetcher.iter_github_metadata(extensions, checkpoint=checkpoint), stage=4),
+            os.path.join(self.data_dir, "4_github_metadata.jsonl")
+        )
+        self.finish()
+
+    def run_packages(self):
+        self.metrics.reset()
+        extensions = self.file_handler.iter_records(os.path.join(self.data_dir, "2_extensions_with_metadata.jsonl"))
+        self.file_handler.save_records(
+            self.store.tee(self.vsix_analyzer.iter_package_metrics(extensions), stage=5),
+            os.path.join(self.data_dir, "5_vsix_package_metrics.jsonl")
+        )
+        self.finish()
+
+    def seed_queue(self, queue, max_results=50, batch_size=100):
+        # Un solo nodo siembra la cola con la lista inicial repartida en lotes
+        if queue.counts(self.queue_name):
+            print(f"La cola ya tiene trabajos: {queue.counts(self.queue_name)}")
+            return 0
+        batches = chunked(self.iter_extensions(max_results=max_results), batch_size)
+        added = queue.enqueue(self.queue_name, ((f"{index:08d}", batch) for index, batch in enumerate(batches)))
+        print(f"Cola sembrada con {added} lotes de hasta {batch_size} extensiones.")
+        return added
+
+    def process_batch(self, extensions, analyze_packages=False):
+        # Etapas 2, 4 y 5 para un lote; la 3 se deriva de la 2 al unir los resultados
+        with_metadata = list(self.file_handler.enrich_with_metadata(
+            self.iter_prefetched(extensions), self.fetch_extension_metadata, enricher=self.enricher
+        ))
+        # Copias: la etapa 4 actualiza los registros en su lugar
+        result = {"2": [dict(ext) for ext in with_metadata]}
+        github_extensions = self.file_handler.iter_github_extensions(dict(ext) for ext in with_metadata)
+        result["4"] = list(self.github_fetcher.iter_github_metadata(github_extensions))
+        if analyze_packages:
+            result["5"] = list(self.vsix_analyzer.iter_package_metrics(dict(ext) for ext in with_metadata))
+        return result
+
+    def work_queue(self, queue, worker_id=None, analyze_packages=False):
+        self.metrics.reset()
+        worker_id = worker_id or default_worker_id()
+        processed = queue.process(self.queue_name, worker_id, lambda batch: self.process_batch(batch, analyze_packages))
+        print(f"Trabajador {worker_id}: {processed} lotes procesados. Estado de la cola: {queue.counts(self.queue_name)}")
+        if self.github_fetcher.line_counter is not None:
+            self.github_fetcher.line_counter.close()
+        self.metrics.export(
+            os.path.join(self.data_dir, f"run_report_{worker_id}.json"),
+            os.path.join(self.data_dir, f"run_metrics_{worker_id}.prom")
+        )
+        return processed
+
+    def merge_queue(self, queue):
+        # Une los resultados parciales en los archivos numerados de siempre, en el orden de la lista inicial
+        counts = queue.counts(self.queue_name)
+        if counts.get("pending") or counts.get("leased"):
+            print(f"Quedan trabajos sin terminar, no se unen los resultados: {counts}")
+            return False
+        if counts.get("failed"):
+            print(f"{counts['failed']} lotes fallaron y se omiten: reintentarlos con JobQueue.retry_failed")
+
+        # Una consulta por etapa, y cada una lee solo su parte del resultado de cada lote
+        def stage(number):
+            for job in queue.results(self.queue_name, f'$."{number}"'):
+                if job["status"] != "done":
+                    continue
+                order = {extension_key(ext): index for index, ext in enumerate(job["payload"])}
+                records = job["result"] or []
+                # La etapa 4 puede entregar en otro orden por los reintentos diferidos
+                yield from sorted(records, key=lambda record: order.get(extension_key(record), len(order)))
+
+        def initial():
+            # Solo hace falta el payload: ningún resultado tiene la clave "1", así que no se lee ninguno
+            for job in queue.results(self.queue_name, '$."1"'):
+                yield from job["payload"]
+
+        metadata_json = os.path.join(self.data_dir, "2_extensions_with_metadata.jsonl")
+        self.file_handler.save_records(
+            self.store.tee(initial(), stage=1), os.path.join(self.data_dir, "1_extensions_initial.jsonl")
+        )
+        self.file_handler.save_records(self.store.tee(stage("2"), stage=2), metadata_json)
+        # La etapa 3 es un filtro de la 2: se lee del archivo ya escrito, no de la cola
+        self.file_handler.save_records(
+            self.file_handler.iter_github_extensions(self.file_handler.iter_records(metadata_json)),
+            os.path.join(self.data_dir, "3_extensions_with_repository.jsonl")
+        )
+        self.file_handler.save_records(
+            self.store.tee(stage("4"), stage=4), os.path.join(self.data_dir, "4_github_metadata.jsonl")
+        )
+        if any(job["result"] is not None for job in queue.results(self.queue_name, '$."5"')):
+            self.file_handler.save_records(
+                self.store.tee(stage("5"), stage=5), os.path.join(self.data_dir, "5_vsix_package_metrics.jsonl")
+            )
+        return True
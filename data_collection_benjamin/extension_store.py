@@ -0,0 +1,197 @@
+import json
+import sqlite3
+from file_handler import extension_key, is_github_repository
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extensions (
+    key TEXT PRIMARY KEY,
+    publisher_name TEXT,
+    ext_name TEXT,
+    stage INTEGER,
+    install_count INTEGER,
+    categories TEXT,
+    repository TEXT,
+    has_github INTEGER,
+    repo_id INTEGER,
+    version TEXT,
+    last_updated TEXT,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS extension_categories (
+    key TEXT,
+    category TEXT,
+    PRIMARY KEY (key, category)
+);
+CREATE TABLE IF NOT EXISTS repositories (
+    repo_id INTEGER PRIMARY KEY,
+    full_name TEXT,
+    main_language TEXT,
+    pushed_at TEXT,
+    stargazers INTEGER,
+    is_archived INTEGER,
+    is_fork INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_extensions_install_count ON extensions (install_count);
+CREATE INDEX IF NOT EXISTS idx_extensions_has_github ON extensions (has_github);
+CREATE INDEX IF NOT EXISTS idx_extensions_repo_id ON extensions (repo_id);
+CREATE INDEX IF NOT EXISTS idx_extension_categories_category ON extension_categories (category);
+CREATE INDEX IF NOT EXISTS idx_repositories_main_language ON repositories (main_language);
+CREATE INDEX IF NOT EXISTS idx_repositories_pushed_at ON repositories (pushed_at);
+"""
+
+UPSERT_EXTENSION = """
+INSERT INTO extensions (key, publisher_name, ext_name, stage, install_count, categories, repository,
+                        has_github, repo_id, version, last_updated, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    stage = MAX(extensions.stage, excluded.stage),
+    install_count = COALESCE(excluded.install_count, extensions.install_count),
+    categories = COALESCE(excluded.categories, extensions.categories),
+    repository = COALESCE(excluded.repository, extensions.repository),
+    has_github = COALESCE(excluded.has_github, extensions.has_github),
+    repo_id = COALESCE(excluded.repo_id, extensions.repo_id),
+    version = COALESCE(excluded.version, extensions.version),
+    last_updated = COALESCE(excluded.last_updated, extensions.last_updated),
+    data = json_patch(extensions.data, ?)
+"""
+
+UPSERT_REPOSITORY = """
+INSERT INTO repositories (repo_id, full_name, main_language, pushed_at, stargazers, is_archived, is_fork)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(repo_id) DO UPDATE SET
+    full_name = excluded.full_name,
+    main_language = excluded.main_language,
+    pushed_at = excluded.pushed_at,
+    stargazers = excluded.stargazers,
+    is_archived = excluded.is_archived,
+    is_fork = excluded.is_fork
+"""
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _known(value):
+    return None if value in (None, "N/A") else value
+
+
+def _without_nulls(value):
+    # En json_patch (RFC 7396) un null borra la clave: un campo sin valor no debe borrar el de una etapa anterior
+    if isinstance(value, dict):
+        return {key: _without_nulls(item) for key, item in value.items() if item is not None}
+    return value
+
+
+class ExtensionStore:
+    def __init__(self, path, batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def tee(self, records, stage):
+        # Las filas se serializan al pasar, antes de que la siguiente etapa modifique el registro
+        batch = []
+        for record in records:
+            batch.append(self._rows(record, stage))
+            yield record
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        self._write(batch)
+
+    def upsert(self, records, stage):
+        self._write([self._rows(record, stage) for record in records])
+
+    def _rows(self, record, stage):
+        key = extension_key(record)
+        repository = _known(record.get("repository"))
+        repo_id = _to_int(record.get("id"))
+        categories = _known(record.get("categories"))
+        extension_row = (
+            key,
+            record["publisher_name"],
+            record["ext_name"],
+            stage,
+            _to_int(record.get("install_count")),
+            categories,
+            repository,
+            int(is_github_repository(repository)) if repository else None,
+            repo_id,
+            _known(record.get("version")),
+            _known(record.get("last_updated")),
+            json.dumps(record, ensure_ascii=False),
+            json.dumps(_without_nulls(record), ensure_ascii=False),
+        )
+        category_rows = [(key, category.strip()) for category in categories.split(",")] if categories else []
+        repository_row = None
+        if repo_id is not None:
+            full_name = "/".join(repository.rstrip("/").split("/")[-2:]) if repository else None
+            repository_row = (
+                repo_id,
+                full_name,
+                _known(record.get("mainLanguage")),
+                _known(record.get("pushedAt")),
+                _to_int(record.get("stargazers")),
+                int(bool(record.get("isArchived"))),
+                int(bool(record.get("isFork"))),
+            )
+        return extension_row, category_rows, repository_row
+
+    def _write(self, batch):
+        if not batch:
+            return
+        with self.conn:
+            self.conn.executemany(UPSERT_EXTENSION, [extension_row for extension_row, _, _ in batch])
+            for extension_row, category_rows, _ in batch:
+                if category_rows:
+                    self.conn.execute("DELETE FROM extension_categories WHERE key = ?", (extension_row[0],))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO extension_categories (key, category) VALUES (?, ?)",
+                [row for _, category_rows, _ in batch for row in category_rows]
+            )
+            self.conn.executemany(UPSERT_REPOSITORY, [row for _, _, row in batch if row is not None])
+
+    def get(self, key):
+        row = self.conn.execute("SELECT data FROM extensions WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def query(self, min_installs=None, category=None, language=None, archived=None, pushed_after=None,
+              github_only=False, order_by="install_count", limit=None):
+        # Cada filtro usa una columna indexada en lugar de recorrer los archivos JSON
+        sql = ["SELECT e.data FROM extensions e LEFT JOIN repositories r ON r.repo_id = e.repo_id WHERE 1 = 1"]
+        params = []
+        if min_installs is not None:
+            sql.append("AND e.install_count >= ?")
+            params.append(min_installs)
+        if category is not None:
+            sql.append("AND e.key IN (SELECT key FROM extension_categories WHERE category = ?)")
+            params.append(category)
+        if language is not None:
+            sql.append("AND r.main_language = ?")
+            params.append(language)
+        if archived is not None:
+            sql.append("AND r.is_archived = ?")
+            params.append(int(archived))
+        if pushed_after is not None:
+            sql.append("AND r.pushed_at >= ?")
+            params.append(pushed_after)
+        if github_only:
+            sql.append("AND e.has_github = 1")
+        if order_by in ("install_count", "last_updated"):
+            sql.append(f"ORDER BY e.{order_by} DESC")
+        elif order_by in ("pushed_at", "stargazers"):
+            sql.append(f"ORDER BY r.{order_by} DESC")
+        if limit is not None:
+            sql.append("LIMIT ?")
+            params.append(limit)
+        for row in self.conn.execute(" ".join(sql), params):
+            yield json.loads(row["data"])
@@ -1,57 +1,133 @@
-import csv
 import json
+import os
+import time
+from itertools import islice
 from tqdm import tqdm
+from writers import StageWriter
+
+
+def is_github_repository(repository):
+    # El mismo criterio para el filtro de la etapa 3 y la columna has_github de la base SQLite
+    return bool(repository) and "github.com" in repository
+
+
+def extension_key(ext):
+    return f"{ext['publisher_name']}.{ext['ext_name']}"
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
 
 class FileHandler:
-    def append_metadata_to_json(self, input_json, output_json, fetch_extension_metadata):
-        with open(input_json, "r", encoding="utf-8") as json_file:
-            extensions = json.load(json_file)
+    def __init__(self, extra_formats=(), metrics=None):
+        # Formatos adicionales ("csv", "parquet") que se escriben en la misma pasada que el JSON
+        self.extra_formats = extra_formats
+        self.metrics = metrics
+
+    def enrich_with_metadata(self, extensions, fetch_extension_metadata, enricher=None, checkpoint=None):
+        # Las extensiones ya registradas en el checkpoint no se vuelven a consultar
+        completed = checkpoint.completed() if checkpoint else {}
+        if completed:
+            print(f"Reanudando: {len(completed)} extensiones ya procesadas.")
 
-        updated_extensions = []
-        for ext in tqdm(extensions, desc="Procesando extensiones", unit="ext"):
-            print(f"Obteniendo metadata para: {ext['publisher_name']}.{ext['ext_name']}")
+        def fetch(ext):
+            key = extension_key(ext)
+            if key in completed:
+                return completed.pop(key)
             metadata = fetch_extension_metadata(ext["publisher_name"], ext["ext_name"])
+            if checkpoint is not None:
+                checkpoint.record(key, metadata)
+            return metadata
+
+        if enricher is None:
+            results = ((ext, fetch(ext)) for ext in extensions)
+        else:
+            results = enricher.imap(fetch, extensions)
+
+        for ext, metadata in tqdm(results, desc="Procesando extensiones", unit="ext"):
             if metadata:
                 ext.update(metadata)
-                updated_extensions.append(ext)
+                yield ext
             else:
                 print(f"Error al obtener metadata para: {ext['publisher_name']}.{ext['ext_name']}")
 
-        self.save_to_json(updated_extensions, output_json)
-    
-    def filter_extensions_with_github_repository(self, input_json, output_json):
-        with open(input_json, 'r', encoding='utf-8') as json_file:
-            extensions = json.load(json_file)
+    def append_metadata_to_json(self, input_json, output_json, fetch_extension_metadata, enricher=None, checkpoint=None):
+        extensions = self.iter_records(input_json)
+        self.save_records(self.enrich_with_metadata(extensions, fetch_extension_metadata, enricher, checkpoint), output_json)
 
-        extensions_with_github_repo = [ext for ext in extensions if ext.get('repository') and 'github.com' in ext['repository']]
+    def iter_github_extensions(self, extensions):
+        return (ext for ext in extensions if is_github_repository(ext.get('repository')))
 
-        if extensions_with_github_repo:
-            self.save_to_json(extensions_with_github_repo, output_json)
-        else:
-            print("No se encontraron extensiones con repositorio de GitHub.")
+    def filter_extensions_with_github_repository(self, input_json, output_json):
+        self.save_records(self.iter_github_extensions(self.iter_records(input_json)), output_json)
 
     def json_to_csv(self, input_json, output_csv):
-        with open(input_json, 'r', encoding='utf-8') as json_file:
-            data = json.load(json_file)
+        writer = StageWriter([output_csv])
+        count = 0
+        for record in self.iter_records(input_json):
+            writer.write(record)
+            count += 1
+        writer.close()
 
-        if not data:
+        if not count:
             print(f"No hay datos en {input_json} para convertir a CSV.")
             return
+        print(f"CSV guardado en: {output_csv}")
 
-        headers = data[0].keys()
+    def iter_records(self, file_path):
+        with open(file_path, "r", encoding="utf-8") as input_file:
+            if file_path.endswith(".jsonl"):
+                for line in input_file:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                yield from json.load(input_file)
 
-        with open(output_csv, 'w', newline='', encoding='utf-8') as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=headers)
-            writer.writeheader()
-            for row in data:
-                writer.writerow(row)
+    def output_paths(self, file_path):
+        base_path = os.path.splitext(file_path)[0]
+        return [file_path] + [f"{base_path}.{extension}" for extension in self.extra_formats]
 
-        print(f"CSV guardado en: {output_csv}")
+    def remove_partial(self, file_path):
+        # Los escritores trabajan sobre archivos .tmp que solo se renombran al cerrar la etapa
+        for path in self.output_paths(file_path):
+            for tmp_path in (f"{path}.tmp", f"{path}.body.tmp", f"{path}.rows.tmp"):
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def write_records(self, records, file_path):
+        # Escribe cada registro a medida que pasa y lo entrega a la siguiente etapa;
+        # los archivos finales solo aparecen cuando el flujo termina completo
+        paths = self.output_paths(file_path)
+        writer = StageWriter(paths)
+        count = 0
+        stage = os.path.splitext(os.path.basename(file_path))[0]
+        if self.metrics is not None:
+            records = self.metrics.track_stage(stage, records)
+        for record in records:
+            start = time.perf_counter()
+            writer.write(record)
+            if self.metrics is not None:
+                self.metrics.add_write_time(stage, time.perf_counter() - start)
+            count += 1
+            yield record
+        writer.close()
+        if count:
+            print(f"Guardado en: {', '.join(paths)}")
+        else:
+            print(f"No hay datos para guardar en {file_path}.")
+
+    def save_records(self, records, file_path):
+        for _ in self.write_records(records, file_path):
+            pass
 
     def save_to_json(self, data, file_path):
         if not data:
             print("No hay datos para guardar en el JSON.")
             return
-        with open(file_path, "w", encoding="utf-8") as output_file:
-            json.dump(data, output_file, ensure_ascii=False, indent=4)
-        print(f"JSON guardado en: {file_path}")
\ No newline at end of file
+        self.save_records(data, file_path)
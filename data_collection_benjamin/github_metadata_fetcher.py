@@ -1,20 +1,87 @@
 import json
-import requests
+import os
 from tqdm import tqdm
+from file_handler import FileHandler, chunked, extension_key
+from deferred_queue import DeferredQueue
+from rate_limiter import TokenPool
+from records import RepoRecord
+
+# Valor de "metrics" mientras GitHub calcula las estadísticas (respuesta 202)
+STATS_PENDING = "Pending"
+
+GRAPHQL_REPO_FIELDS = """
+fragment RepoFields on Repository {
+  databaseId
+  name
+  isFork
+  forkCount
+  primaryLanguage { name }
+  defaultBranchRef {
+    name
+    target { ... on Commit { oid message history { totalCount } } }
+  }
+  licenseInfo { name }
+  homepageUrl
+  watchers { totalCount }
+  stargazerCount
+  diskUsage
+  createdAt
+  pushedAt
+  updatedAt
+  issues { totalCount }
+  openIssues: issues(states: OPEN) { totalCount }
+  pullRequests { totalCount }
+  openPullRequests: pullRequests(states: OPEN) { totalCount }
+  refs(refPrefix: "refs/heads/") { totalCount }
+  releases { totalCount }
+  hasWikiEnabled
+  isArchived
+  isDisabled
+  isLocked
+  labels { totalCount }
+  languages(first: 20, orderBy: {field: SIZE, direction: DESC}) { edges { size node { name } } }
+  repositoryTopics(first: 20) { nodes { topic { name } } }
+}
+"""
 
 class GitHubMetadataFetcher:
-    def __init__(self, github_token):
+    def __init__(self, github_token, backend="rest", batch_size=40, http_cache=None, line_counter=None, clones_dir=None,
+                 transport=None):
         self.github_token = github_token
+        # Con clones locales las líneas se cuentan en disco, sin llamadas a la API
+        self.line_counter = line_counter
+        self.clones_dir = clones_dir
+        self.token_pool = TokenPool(github_token, transport=transport)
+        self.http_cache = http_cache
+        self.backend = backend
+        self.batch_size = batch_size
+        self._prefetched = {}
+        # Repositorios que GitHub confirmó como inexistentes; solo esos se guardan vacíos en el checkpoint
+        self._missing = set()
+
+    def _request(self, method, url, **kwargs):
+        if self.http_cache is None:
+            return self.token_pool.request(method, url, **kwargs)
+        return self.http_cache.request(self.token_pool.request, method, url, **kwargs)
 
     def fetch_code_metrics(self, owner, repo):
+        repo_path = os.path.join(self.clones_dir, owner, repo) if self.clones_dir else None
+        if self.line_counter is not None and repo_path and os.path.isdir(repo_path):
+            counts = self.line_counter.count(repo_path)
+            return {
+                "blankLines": counts["blankLines"],
+                "codeLines": counts["codeLines"],
+                "commentLines": counts["commentLines"],
+                "metrics": f"Blank Lines: {counts['blankLines']}, Code Lines: {counts['codeLines']}, Comment Lines: {counts['commentLines']}"
+            }
+
         url = f"https://api.github.com/repos/{owner}/{repo}/stats/code_frequency"
         headers = {
             "Accept": "application/vnd.github+json",
-            "Authorization": f"Bearer {self.github_token}",
             "X-GitHub-Api-Version": "2022-11-28"
         }
         try:
-            response = requests.get(url, headers=headers)
+            response = self._request("GET", url, headers=headers)
             if response.status_code == 200:
                 data = response.json()
                 additions = sum(week[1] for week in data)
@@ -28,6 +95,9 @@ class GitHubMetadataFetcher:
                     "commentLines": comment_lines,
                     "metrics": f"Blank Lines: {blank_lines}, Code Lines: {code_lines}, Comment Lines: {comment_lines}"
                 }
+            if response.status_code == 202:
+                # GitHub está calculando las estadísticas en segundo plano; se reintentará más tarde
+                return {"blankLines": None, "codeLines": None, "commentLines": None, "metrics": STATS_PENDING}
         except Exception as e:
             print(f"Error al obtener las métricas de código desde {url}: {e}")
         return {"blankLines": 0, "codeLines": 0, "commentLines": 0, "metrics": "No data"}
@@ -36,11 +106,10 @@ class GitHubMetadataFetcher:
         url = f"https://api.github.com/repos/{owner}/{repo}/commits"
         headers = {
             "Accept": "application/vnd.github+json",
-            "Authorization": f"Bearer {self.github_token}",
             "X-GitHub-Api-Version": "2022-11-28"
         }
         try:
-            response = requests.get(url, headers=headers)
+            response = self._request("GET", url, headers=headers)
             if response.status_code == 200:
                 commits = response.json()
                 if commits:
@@ -55,65 +124,93 @@ class GitHubMetadataFetcher:
             print(f"Excepción al obtener el último commit de {url}: {e}")
         return {"lastCommit": "", "lastCommitSHA": ""}
 
+    def fetch_github_metadata_batch(self, repos):
+        # Una sola consulta GraphQL con un alias por repositorio
+        aliases = {f"r{i}": (owner, repo) for i, (owner, repo) in enumerate(repos)}
+        query = "query {\n" + "\n".join(
+            f"  {alias}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) {{ ...RepoFields }}"
+            for alias, (owner, repo) in aliases.items()
+        ) + "\n}\n" + GRAPHQL_REPO_FIELDS
+
+        url = "https://api.github.com/graphql"
+        headers = {
+            "Content-Type": "application/json"
+        }
+        results = {}
+        try:
+            response = self._request("POST", url, headers=headers, json={"query": query})
+            if response.status_code == 200:
+                body = response.json()
+                data = body.get("data") or {}
+                errors = body.get("errors") or []
+                # Un 200 puede traer errores (RATE_LIMITED, timeouts) con data nula o parcial:
+                # solo NOT_FOUND en la ruta del alias significa que el repositorio no existe
+                not_found = {error["path"][0] for error in errors if error.get("type") == "NOT_FOUND" and error.get("path")}
+                if len(not_found) < len(errors):
+                    print(f"Errores en la consulta GraphQL: {[error.get('type') or error.get('message') for error in errors]}")
+                for alias, (owner, repo) in aliases.items():
+                    repo_data = data.get(alias)
+                    key = (owner.lower(), repo.lower())
+                    if repo_data:
+                        results[key] = self._graphql_to_metadata(owner, repo, repo_data)
+                    elif alias in not_found:
+                        # None indica que GitHub no encontró el repositorio
+                        results[key] = None
+                        self._missing.add(key)
+                    # Los demás alias quedan fuera y se consultan por REST
+            else:
+                print(f"Error en la consulta GraphQL: {response.status_code} - {response.text}")
+        except Exception as e:
+            print(f"Excepción en la consulta GraphQL: {e}")
+        return results
+
+    def _graphql_to_metadata(self, owner, repo, repo_data):
+        return RepoRecord.from_graphql(owner, repo, repo_data, self.fetch_code_metrics(owner, repo))
+
+    def prefetch_github_metadata(self, extensions):
+        repos = []
+        for ext in extensions:
+            repo_url = ext.get("repository", "")
+            if "github.com" in repo_url:
+                repos.append(self._parse_repo_url(repo_url))
+        repos = list(dict.fromkeys(repos))
+        batches = [repos[i:i + self.batch_size] for i in range(0, len(repos), self.batch_size)]
+        for batch in batches:
+            self._prefetched.update(self.fetch_github_metadata_batch(batch))
+
+    def _parse_repo_url(self, repo_url):
+        owner, repo = repo_url.split("/")[-2], repo_url.split("/")[-1]
+        if repo.endswith(".git"):
+            repo = repo[:-4]
+        return owner, repo
+
     def fetch_github_metadata(self, owner, repo):
         if repo.endswith(".git"):
             repo = repo[:-4]
 
+        key = (owner.lower(), repo.lower())
+        if key in self._prefetched:
+            record = self._prefetched.pop(key)
+            if record is None:
+                print(f"Repositorio no encontrado: {owner}/{repo}")
+                return None
+            return record.to_dict()
+
         url = f"https://api.github.com/repos/{owner}/{repo}"
         headers = {
             "Accept": "application/vnd.github+json",
-            "Authorization": f"Bearer {self.github_token}",
             "X-GitHub-Api-Version": "2022-11-28"
         }
         try:
-            response = requests.get(url, headers=headers)
+            response = self._request("GET", url, headers=headers)
             if response.status_code == 200:
                 repo_data = response.json()
                 last_commit_data = self.fetch_last_commit(owner, repo)
                 code_metrics = self.fetch_code_metrics(owner, repo)
-                return {
-                    "id": repo_data.get("id", "N/A"),
-                    "name": repo_data.get("name", "N/A"),
-                    "isFork": repo_data.get("fork", False),
-                    "commits": repo_data.get("commits_url", "").split("{")[0],
-                    "branches": repo_data.get("branches_url", "").split("{")[0],
-                    "releases": repo_data.get("releases_url", "").split("{")[0],
-                    "forks": repo_data.get("forks_count", 0),
-                    "mainLanguage": repo_data.get("language", "N/A"),
-                    "defaultBranch": repo_data.get("default_branch", "N/A"),
-                    "license": repo_data.get("license", {}).get("name", "N/A"),
-                    "homepage": repo_data.get("homepage", "N/A"),
-                    "watchers": repo_data.get("watchers_count", 0),
-                    "stargazers": repo_data.get("stargazers_count", 0),
-                    "contributors": repo_data.get("contributors_url", ""),
-                    "size": repo_data.get("size", 0),
-                    "createdAt": repo_data.get("created_at", "N/A"),
-                    "pushedAt": repo_data.get("pushed_at", "N/A"),
-                    "updatedAt": repo_data.get("updated_at", "N/A"),
-                    "totalIssues": repo_data.get("open_issues_count", 0),
-                    "openIssues": repo_data.get("open_issues_count", 0),
-                    "totalPullRequests": repo_data.get("pulls_url", "").split("{")[0],
-                    "openPullRequests": repo_data.get("pulls_url", "").split("{")[0],
-                    "blankLines": code_metrics.get("blankLines", 0),
-                    "codeLines": code_metrics.get("codeLines", 0),
-                    "commentLines": code_metrics.get("commentLines", 0),
-                    "metrics": code_metrics.get("metrics", ""),
-                    "lastCommit": last_commit_data.get("lastCommit", ""),
-                    "lastCommitSHA": last_commit_data.get("lastCommitSHA", ""),
-                    "hasWiki": repo_data.get("has_wiki", False),
-                    "isArchived": repo_data.get("archived", False),
-                    "isDisabled": repo_data.get("disabled", False),
-                    "isLocked": repo_data.get("locked", False),
-                    "languages": repo_data.get("languages_url", ""),
-                    "labels": repo_data.get("labels_url", ""),
-                    "topics": ", ".join(repo_data.get("topics", []))
-                }
-            elif response.status_code == 403 and 'X-RateLimit-Remaining' in response.headers and response.headers['X-RateLimit-Remaining'] == '0':
-                reset_time = int(response.headers['X-RateLimit-Reset'])
-                print(f"Rate limit exceeded. Please try again after {reset_time}.")
-                return None
+                return RepoRecord.from_rest(repo_data, last_commit_data, code_metrics).to_dict()
             elif response.status_code == 404:
                 print(f"Repositorio no encontrado: {url}")
+                self._missing.add(key)
                 return None
             else:
                 print(f"Error al obtener metadata de {url}: {response.status_code} - {response.text}")
@@ -121,21 +218,77 @@ class GitHubMetadataFetcher:
             print(f"Excepción al obtener metadata de {url}: {e}")
         return None
     
-    def extract_github_metadata_to_json(self, input_json, output_json):
-        with open(input_json, "r", encoding="utf-8") as json_file:
-            extensions = json.load(json_file)
+    def _is_missing(self, owner, repo):
+        return (owner.lower(), repo.lower()) in self._missing
+
+    def iter_github_metadata(self, extensions, checkpoint=None, carry_forward=None, deferred=None):
+        deferred = deferred or DeferredQueue()
+        completed = checkpoint.completed() if checkpoint else {}
+        if completed:
+            print(f"Reanudando: {len(completed)} repositorios ya procesados.")
+
+        extensions = tqdm(extensions, desc="Obteniendo metadata de GitHub", unit="ext")
+        for chunk in chunked(extensions, self.batch_size):
+            if carry_forward is not None:
+                # Los repositorios de extensiones sin cambios reutilizan la metadata anterior
+                for ext in chunk:
+                    previous = carry_forward(ext)
+                    if previous:
+                        completed.setdefault(extension_key(ext), previous)
+
+            if self.backend == "graphql":
+                self.prefetch_github_metadata([ext for ext in chunk if extension_key(ext) not in completed])
+
+            for ext in chunk:
+                key = extension_key(ext)
+                repo_url = ext.get("repository", "")
+                if key in completed:
+                    metadata = completed.pop(key)
+                elif "github.com" in repo_url:
+                    # Sin ".git": el nombre también se usa en los reintentos diferidos de fetch_code_metrics
+                    owner, repo = self._parse_repo_url(repo_url)
+                    metadata = self.fetch_github_metadata(owner, repo)
+                    if metadata and metadata.get("metrics") == STATS_PENDING:
+                        # El registro espera en la cola y el resto del rastreo continúa
+                        deferred.push((ext, owner, repo, metadata))
+                        if self.token_pool.transport.metrics is not None:
+                            self.token_pool.transport.metrics.count("stats_deferred")
+                        continue
+                    # Un fallo transitorio no se guarda: al reanudar, el repositorio se vuelve a consultar
+                    if checkpoint is not None and (metadata or self._is_missing(owner, repo)):
+                        checkpoint.record(key, metadata)
+                    if not metadata:
+                        print(f"Error al obtener metadata de GitHub para: {repo_url}")
+                else:
+                    continue
 
-        updated_extensions = []
-        for ext in tqdm(extensions, desc="Obteniendo metadata de GitHub", unit="ext"):
-            repo_url = ext.get("repository", "")
-            if "github.com" in repo_url:
-                owner, repo = repo_url.split("/")[-2], repo_url.split("/")[-1]
-                metadata = self.fetch_github_metadata(owner, repo)
                 if metadata:
                     ext.update(metadata)
-                    updated_extensions.append(ext)
-                else:
-                    print(f"Error al obtener metadata de GitHub para: {repo_url}")
+                    yield ext
+
+            yield from self._retry_deferred(deferred, checkpoint)
+
+        while len(deferred):
+            deferred.wait_next()
+            yield from self._retry_deferred(deferred, checkpoint)
+
+    def _retry_deferred(self, deferred, checkpoint):
+        for (ext, owner, repo, metadata), attempt in deferred.pop_ready():
+            code_metrics = self.fetch_code_metrics(owner, repo)
+            if code_metrics["metrics"] == STATS_PENDING:
+                if attempt + 1 < deferred.max_attempts:
+                    deferred.push((ext, owner, repo, metadata), attempt + 1)
+                    continue
+                print(f"GitHub no terminó de calcular las estadísticas de {owner}/{repo}")
+                code_metrics = dict(code_metrics, metrics="No data")
+
+            metadata.update(code_metrics)
+            if checkpoint is not None:
+                checkpoint.record(extension_key(ext), metadata)
+            ext.update(metadata)
+            yield ext
 
-        with open(output_json, 'w', encoding='utf-8') as json_file:
-            json.dump(updated_extensions, json_file, ensure_ascii=False, indent=4)
\ No newline at end of file
+    def extract_github_metadata_to_json(self, input_json, output_json, checkpoint=None):
+        file_handler = FileHandler()
+        extensions = file_handler.iter_records(input_json)
+        file_handler.save_records(self.iter_github_metadata(extensions, checkpoint), output_json)
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class CachedResponse:
+    def __init__(self, status_code, headers, text):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.content = text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class HttpCache:
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, ttl=6 * 3600, negative_ttl=24 * 3600, metrics=None):
+        self.metrics = metrics
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(
+            os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir) if name.endswith(".json")
+        )
+
+    def request(self, send, method, url, headers=None, **kwargs):
+        # GraphQL no se guarda: un POST no se puede revalidar y su resultado depende del cupo del token
+        if url.rstrip("/").endswith("/graphql"):
+            return send(method, url, headers=headers, **kwargs)
+
+        body = kwargs.get("json", kwargs.get("data"))
+        path = self._path(method, url, body)
+        entry = self._load(path)
+        request_headers = dict(headers or {})
+
+        if entry:
+            if entry["expires_at"] and entry["expires_at"] > time.time():
+                # Respuesta vigente (incluye 404 recordados): no se hace ninguna solicitud
+                self._touch(path)
+                self._count("http_cache_hit")
+                return self._to_response(entry)
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = send(method, url, headers=request_headers, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self._touch(path)
+            self._count("http_cache_revalidated")
+            return self._to_response(entry)
+        if response.status_code in (200, 404) and not self._has_errors(response):
+            self._store(path, response)
+        return response
+
+    def _has_errors(self, response):
+        # Un 200 con "errors" (RATE_LIMITED, timeouts) es un fallo transitorio, no una respuesta que recordar
+        try:
+            data = response.json()
+        except ValueError:
+            return False
+        return isinstance(data, dict) and bool(data.get("errors"))
+
+    def _count(self, event):
+        if self.metrics is not None:
+            self.metrics.count(event)
+
+    def _path(self, method, url, body):
+        if body is not None and not isinstance(body, (str, bytes)):
+            body = json.dumps(body, sort_keys=True)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        key = hashlib.sha256(method.upper().encode("utf-8") + b"\n" + url.encode("utf-8") + b"\n" + (body or b"")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, path, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 404:
+            expires_at = time.time() + self.negative_ttl
+        elif etag or last_modified:
+            # Con validadores siempre se revalida con una solicitud condicional
+            expires_at = 0
+        elif self.ttl:
+            expires_at = time.time() + self.ttl
+        else:
+            return
+
+        entry = {
+            "status_code": response.status_code,
+            "headers": {key: value for key, value in response.headers.items() if key.lower() in ("content-type", "etag", "last-modified")},
+            "text": response.text,
+            "etag": etag,
+            "last_modified": last_modified,
+            "expires_at": expires_at,
+        }
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as cache_file:
+            json.dump(entry, cache_file, ensure_ascii=False)
+        with self._lock:
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._total_bytes += os.path.getsize(path) - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _touch(self, path):
+        # La fecha de modificación sirve como marca de último uso para el desalojo LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        # Elimina las entradas usadas hace más tiempo hasta quedar bajo el 90% del límite
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+    def _to_response(self, entry):
+        return CachedResponse(entry["status_code"], entry["headers"], entry["text"])
@@ -0,0 +1,57 @@
+import random
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# Errores de servidor que suelen ser transitorios y vale la pena reintentar
+RETRY_STATUSES = {500, 502, 503, 504}
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+class HttpTransport:
+    def __init__(self, pool_size=16, connect_timeout=5, read_timeout=30, max_retries=3, backoff=0.5, max_backoff=30,
+                 metrics=None):
+        self.metrics = metrics
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # Una sola sesión: las conexiones keep-alive se reutilizan entre solicitudes al mismo host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+                self._observe(url, response, time.perf_counter() - start, attempt, kwargs.get("stream"))
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                reason = response.status_code
+            except RETRY_EXCEPTIONS as e:
+                if self.metrics is not None:
+                    self.metrics.observe_request(url, type(e).__name__, time.perf_counter() - start, 0, int(attempt > 0))
+                if attempt >= self.max_retries:
+                    raise
+                reason = type(e).__name__
+            # Espera exponencial con variación aleatoria para que los hilos no reintenten a la vez
+            delay = random.uniform(0, min(self.backoff * 2 ** attempt, self.max_backoff))
+            print(f"Error transitorio ({reason}) en {url}. Reintento {attempt + 1} en {delay:.1f} s...")
+            time.sleep(delay)
+            attempt += 1
+
+    def _observe(self, url, response, seconds, attempt, stream):
+        if self.metrics is None:
+            return
+        # Content-Length es el tamaño transferido (comprimido); con stream=True el cuerpo aún no se leyó
+        size = int(response.headers.get("Content-Length") or 0) or (0 if stream else len(response.content))
+        self.metrics.observe_request(url, response.status_code, seconds, size, int(attempt > 0))
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,50 @@
+import os
+from file_handler import FileHandler, extension_key
+
+
+class Snapshot:
+    def __init__(self, metadata_path, github_path):
+        self.metadata = self._load(metadata_path)
+        self.github = self._load(github_path)
+        self._seen = set()
+        self._unchanged = set()
+
+    def _load(self, path):
+        if not os.path.exists(path):
+            return {}
+        return {extension_key(record): record for record in FileHandler().iter_records(path)}
+
+    def listed(self, extensions):
+        # Todo lo que aparece en la lista de la etapa 1 sigue publicado, aunque su consulta
+        # de metadata falle o el checkpoint la omita al reanudar
+        for ext in extensions:
+            self._seen.add(extension_key(ext))
+            yield ext
+
+    def unchanged_metadata(self, key, version, last_updated):
+        # Devuelve el registro anterior solo si la versión y la fecha de actualización no cambiaron
+        previous = self.metadata.get(key)
+        if previous and previous.get("version") == version and previous.get("last_updated") == last_updated:
+            self._unchanged.add(key)
+            return previous
+        return None
+
+    def unchanged_github(self, ext):
+        key = extension_key(ext)
+        previous = self.github.get(key)
+        if key not in self._unchanged or not previous:
+            return None
+        # Solo se reutilizan los campos de GitHub; los del Marketplace ya vienen actualizados
+        return {field: value for field, value in previous.items() if field not in ext}
+
+    def removed(self):
+        for key, record in self.metadata.items():
+            if key not in self._seen:
+                yield dict(record, refresh_status="removed")
+
+    def summary(self):
+        return {
+            "unchanged": len(self._unchanged),
+            "changed_or_new": len(self._seen) - len(self._unchanged),
+            "removed": len(self.metadata.keys() - self._seen),
+        }
@@ -0,0 +1,220 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+# Sin WAL: el modo de journal por defecto es el que funciona cuando el archivo está en almacenamiento compartido
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    queue TEXT,
+    key TEXT,
+    position INTEGER,
+    payload TEXT,
+    status TEXT DEFAULT 'pending',
+    worker TEXT,
+    lease_id TEXT,
+    lease_expires REAL,
+    attempts INTEGER DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    created_at REAL,
+    PRIMARY KEY (queue, key)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (queue, status, position);
+CREATE INDEX IF NOT EXISTS idx_jobs_order ON jobs (queue, position);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Job:
+    __slots__ = ("queue", "key", "payload", "attempts", "lease_id")
+
+    def __init__(self, queue, key, payload, attempts, lease_id):
+        self.queue = queue
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+        self.lease_id = lease_id
+
+
+class JobQueue:
+    def __init__(self, path, lease_seconds=900, max_attempts=3, timeout=60):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Una conexión por proceso, compartida entre hilos bajo un lock; las transacciones son explícitas
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self, operation):
+        # BEGIN IMMEDIATE toma el lock de escritura al inicio: dos nodos no pueden reclamar el mismo trabajo
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = operation(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, queue, items):
+        # items son pares (clave, payload); una clave ya encolada no se duplica al volver a sembrar
+        def insert(conn):
+            position = conn.execute("SELECT COALESCE(MAX(position), -1) FROM jobs WHERE queue = ?", (queue,)).fetchone()[0]
+            now = time.time()
+            added = 0
+            for key, payload in items:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO jobs (queue, key, position, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (queue, key, position + 1, json.dumps(payload, ensure_ascii=False), now)
+                )
+                if cursor.rowcount:
+                    position += 1
+                    added += 1
+            return added
+        return self._transaction(insert)
+
+    def _requeue_expired(self, conn, queue, now):
+        # Un trabajador caído deja su concesión vencida: el trabajo vuelve a la cola o se da por fallido
+        conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = 'lease expired', worker = NULL, lease_id = NULL "
+            "WHERE queue = ? AND status = 'leased' AND lease_expires < ?",
+            (self.max_attempts, queue, now)
+        )
+
+    def claim(self, queue, worker):
+        def take(conn):
+            now = time.time()
+            self._requeue_expired(conn, queue, now)
+            row = conn.execute(
+                "SELECT key, payload, attempts FROM jobs WHERE queue = ? AND status = 'pending' ORDER BY position LIMIT 1",
+                (queue,)
+            ).fetchone()
+            if row is None:
+                return None
+            lease_id = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_id = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE queue = ? AND key = ?",
+                (worker, lease_id, now + self.lease_seconds, queue, row[0])
+            )
+            return Job(queue, row[0], json.loads(row[1]), row[2] + 1, lease_id)
+        return self._transaction(take)
+
+    def heartbeat(self, job):
+        def extend(conn):
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE queue = ? AND key = ? AND lease_id = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, job.queue, job.key, job.lease_id)
+            )
+            return cursor.rowcount == 1
+        return self._transaction(extend)
+
+    def complete(self, job, result):
+        # Solo cuenta si la concesión sigue siendo de este trabajador; si venció, el resultado se descarta
+        def finish(conn):
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_id = NULL "
+                "WHERE queue = ? AND key = ? AND lease_id = ?",
+                (json.dumps(result, ensure_ascii=False), job.queue, job.key, job.lease_id)
+            )
+            return cursor.rowcount == 1
+        return self._transaction(finish)
+
+    def fail(self, job, error):
+        def release(conn):
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, worker = NULL, lease_id = NULL WHERE queue = ? AND key = ? AND lease_id = ?",
+                (self.max_attempts, str(error), job.queue, job.key, job.lease_id)
+            )
+        self._transaction(release)
+
+    def retry_failed(self, queue):
+        def reset(conn):
+            return conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, error = NULL WHERE queue = ? AND status = 'failed'",
+                (queue,)
+            ).rowcount
+        return self._transaction(reset)
+
+    def counts(self, queue):
+        with self._lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs WHERE queue = ? GROUP BY status", (queue,))
+            return dict(rows.fetchall())
+
+    def results(self, queue, result_path=None):
+        # Siempre en el orden de encolado, sin importar qué nodo terminó primero. Se recorre el cursor
+        # de una conexión propia: la memoria no crece con la cola y el lock no queda tomado entre filas.
+        # Con result_path (p. ej. '$."4"') SQLite extrae solo esa parte del resultado
+        result_column = "json_extract(result, ?)" if result_path else "result"
+        params = ((result_path,) if result_path else ()) + (queue,)
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            rows = conn.execute(
+                f"SELECT key, status, payload, {result_column}, error, created_at FROM jobs WHERE queue = ? ORDER BY position",
+                params
+            )
+            for key, status, payload, result, error, created_at in rows:
+                yield {
+                    "key": key,
+                    "status": status,
+                    "payload": json.loads(payload),
+                    "result": json.loads(result) if result is not None else None,
+                    "error": error,
+                    "created_at": created_at,
+                }
+        finally:
+            conn.close()
+
+    def process(self, queue, worker, handle, poll_interval=10):
+        # Reclama trabajos hasta que no quede ninguno pendiente ni concedido a otro trabajador
+        processed = 0
+        while True:
+            job = self.claim(queue, worker)
+            if job is None:
+                counts = self.counts(queue)
+                if not counts.get("leased"):
+                    return processed
+                # Otros nodos tienen trabajos en curso; si alguno muere, su concesión vence y se retoma aquí
+                time.sleep(poll_interval)
+                continue
+
+            stop = threading.Event()
+            renewer = threading.Thread(target=self._renew, args=(job, stop), daemon=True)
+            renewer.start()
+            try:
+                result = handle(job.payload)
+            except Exception as e:
+                print(f"Error en el trabajo {job.key} (intento {job.attempts}): {e}")
+                self.fail(job, e)
+                continue
+            finally:
+                stop.set()
+                renewer.join()
+
+            if self.complete(job, result):
+                processed += 1
+            else:
+                print(f"La concesión del trabajo {job.key} venció; el resultado se descarta.")
+
+    def _renew(self, job, stop):
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.heartbeat(job):
+                return
@@ -0,0 +1,186 @@
+import json
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+# Con "quotes", un bloque puede abrirse a mitad de línea si el delimitador está fuera de un literal;
+# sin ella, solo cuando la línea empieza con el delimitador (docstrings de Python, por ejemplo)
+QUOTES = ('"', "'", "`")
+C_STYLE = {"line": ("//",), "block": (("/*", "*/"),), "quotes": QUOTES}
+HASH_STYLE = {"line": ("#",), "block": ()}
+MARKUP_STYLE = {"line": (), "block": (("<!--", "-->"),)}
+
+# extensión -> (lenguaje, sintaxis de comentarios)
+LANGUAGES = {
+    ".js": ("JavaScript", C_STYLE), ".mjs": ("JavaScript", C_STYLE), ".cjs": ("JavaScript", C_STYLE),
+    ".jsx": ("JavaScript", C_STYLE), ".ts": ("TypeScript", C_STYLE), ".tsx": ("TypeScript", C_STYLE),
+    ".java": ("Java", C_STYLE), ".kt": ("Kotlin", C_STYLE), ".scala": ("Scala", C_STYLE),
+    ".c": ("C", C_STYLE), ".h": ("C", C_STYLE), ".cc": ("C++", C_STYLE), ".cpp": ("C++", C_STYLE),
+    ".hpp": ("C++", C_STYLE), ".cs": ("C#", C_STYLE), ".go": ("Go", C_STYLE), ".rs": ("Rust", C_STYLE),
+    ".swift": ("Swift", C_STYLE), ".dart": ("Dart", C_STYLE), ".php": ("PHP", C_STYLE),
+    ".css": ("CSS", {"line": (), "block": (("/*", "*/"),), "quotes": QUOTES}), ".scss": ("SCSS", C_STYLE), ".less": ("Less", C_STYLE),
+    ".py": ("Python", {"line": ("#",), "block": (('"""', '"""'), ("'''", "'''"))}),
+    ".rb": ("Ruby", HASH_STYLE), ".sh": ("Shell", HASH_STYLE), ".bash": ("Shell", HASH_STYLE),
+    ".ps1": ("PowerShell", {"line": ("#",), "block": (("<#", "#>"),)}), ".pl": ("Perl", HASH_STYLE),
+    ".r": ("R", HASH_STYLE), ".yaml": ("YAML", HASH_STYLE), ".yml": ("YAML", HASH_STYLE),
+    ".toml": ("TOML", HASH_STYLE), ".lua": ("Lua", {"line": ("--",), "block": (("--[[", "]]"),), "quotes": QUOTES}),
+    ".sql": ("SQL", {"line": ("--",), "block": (("/*", "*/"),), "quotes": ("'", '"')}),
+    ".html": ("HTML", MARKUP_STYLE), ".xml": ("XML", MARKUP_STYLE), ".vue": ("Vue", MARKUP_STYLE),
+    ".svelte": ("Svelte", MARKUP_STYLE),
+}
+
+# Directorios de dependencias o artefactos generados que no son código propio del repositorio
+SKIPPED_DIRS = {
+    ".git", "node_modules", "bower_components", "vendor", "third_party", "dist", "out", "build",
+    ".vscode-test", "__pycache__", ".venv", "venv",
+}
+SKIPPED_SUFFIXES = (".min.js", ".min.css", ".bundle.js", ".d.ts.map")
+
+
+def find_unquoted(line, token, quotes):
+    # Posición de token fuera de literales de texto, o -1; '**/*.ts' no abre un comentario
+    quote = None
+    index = 0
+    while index < len(line):
+        char = line[index]
+        if quote is not None:
+            if char == "\\":
+                index += 1
+            elif char == quote:
+                quote = None
+        elif line.startswith(token, index):
+            return index
+        elif char in quotes:
+            quote = char
+        index += 1
+    return -1
+
+
+def block_opener(stripped, syntax):
+    quotes = syntax.get("quotes")
+    if quotes is None:
+        return next(((pair, 0) for pair in syntax["block"] if stripped.startswith(pair[0])), (None, -1))
+
+    found, start = None, -1
+    for pair in syntax["block"]:
+        index = find_unquoted(stripped, pair[0], quotes)
+        if index >= 0 and (start < 0 or index < start):
+            found, start = pair, index
+    # Después de un comentario de línea, el resto ya es comentario
+    line_comments = [find_unquoted(stripped, token, quotes) for token in syntax["line"]]
+    if found and any(0 <= index < start for index in line_comments):
+        return None, -1
+    return found, start
+
+
+def count_file(path):
+    language, syntax = LANGUAGES[os.path.splitext(path)[1].lower()]
+    blank = comment = code = 0
+    block_end = None
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as source_file:
+            for line in source_file:
+                stripped = line.strip()
+                if block_end is not None:
+                    # Las líneas en blanco dentro de un bloque siguen contando como blancas
+                    if not stripped:
+                        blank += 1
+                    else:
+                        comment += 1
+                        if block_end in stripped:
+                            block_end = None
+                elif not stripped:
+                    blank += 1
+                elif syntax["line"] and stripped.startswith(syntax["line"]):
+                    comment += 1
+                else:
+                    block, start = block_opener(stripped, syntax)
+                    if block and start == 0:
+                        comment += 1
+                    else:
+                        code += 1
+                    # Un bloque abierto que no se cierra en la misma línea continúa en las siguientes
+                    if block and block[1] not in stripped[start + len(block[0]):]:
+                        block_end = block[1]
+    except OSError:
+        pass
+    return language, blank, comment, code
+
+
+def count_files(paths):
+    totals = {}
+    for path in paths:
+        language, blank, comment, code = count_file(path)
+        counts = totals.setdefault(language, [0, 0, 0, 0])
+        counts[0] += 1
+        counts[1] += blank
+        counts[2] += comment
+        counts[3] += code
+    return totals
+
+
+def iter_source_files(repo_path):
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [name for name in dirs if name not in SKIPPED_DIRS]
+        for name in files:
+            lower_name = name.lower()
+            if os.path.splitext(lower_name)[1] in LANGUAGES and not lower_name.endswith(SKIPPED_SUFFIXES):
+                yield os.path.join(root, name)
+
+
+def repo_head_sha(repo_path):
+    try:
+        result = subprocess.run(["git", "-C", repo_path, "rev-parse", "HEAD"],
+                                check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return result.stdout.decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class LineCounter:
+    def __init__(self, cache_dir=None, max_workers=None, files_per_task=64):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.files_per_task = files_per_task
+        self._executor = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def count(self, repo_path):
+        # Los conteos de un commit no cambian, así que se guardan por SHA
+        sha = repo_head_sha(repo_path)
+        cache_path = os.path.join(self.cache_dir, f"{sha}.json") if self.cache_dir and sha else None
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as cache_file:
+                return json.load(cache_file)
+
+        paths = list(iter_source_files(repo_path))
+        tasks = [paths[i:i + self.files_per_task] for i in range(0, len(paths), self.files_per_task)]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        languages = {}
+        for partial in self._executor.map(count_files, tasks):
+            for language, counts in partial.items():
+                totals = languages.setdefault(language, {"files": 0, "blankLines": 0, "commentLines": 0, "codeLines": 0})
+                totals["files"] += counts[0]
+                totals["blankLines"] += counts[1]
+                totals["commentLines"] += counts[2]
+                totals["codeLines"] += counts[3]
+
+        result = {
+            "sha": sha,
+            "blankLines": sum(totals["blankLines"] for totals in languages.values()),
+            "commentLines": sum(totals["commentLines"] for totals in languages.values()),
+            "codeLines": sum(totals["codeLines"] for totals in languages.values()),
+            "languages": languages,
+        }
+        if cache_path:
+            with open(cache_path, "w", encoding="utf-8") as cache_file:
+                json.dump(result, cache_file)
+        return result
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -1,11 +1,10 @@
-from extension_metadata_extractor import ExtensionMetadataExtractor
-from dotenv import load_dotenv
 import os
+import sys
 
-# Cargar las variables de entorno desde el archivo .env
-load_dotenv()
+# main.py es un atajo de `vscode-extractor run`: las opciones y sus valores por defecto (p. ej. --max-results 10)
+# vienen de la CLI, así que los dos puntos de entrada no pueden separarse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from vscode_extractor.cli import main
 
 if __name__ == "__main__":
-    github_token = os.getenv("GITHUB_TOKEN")  # Obtener el token de GitHub desde las variables de entorno
-    extractor = ExtensionMetadataExtractor(github_token)
-    extractor.run(max_results=10)  # Puedes cambiar a 100 si lo deseas
\ No newline at end of file
+    main(["run"] + sys.argv[1:])
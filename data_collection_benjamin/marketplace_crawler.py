@@ -0,0 +1,126 @@
+import math
+from concurrent_enricher import ConcurrentEnricher
+from http_transport import HttpTransport
+
+EXTENSION_QUERY_URL = "https://marketplace.visualstudio.com/_apis/public/gallery/extensionquery"
+
+VSCODE_CRITERIA = [
+    {"filterType": 8, "value": "Microsoft.VisualStudio.Code"},
+    {"filterType": 10, "value": 'target:"Microsoft.VisualStudio.Code"'},
+    {"filterType": 12, "value": "37888"},
+]
+
+# Categorías de VS Code usadas para repartir el catálogo en consultas independientes (filterType 5)
+CATEGORIES = [
+    "AI", "Azure", "Chat", "Data Science", "Debuggers", "Education", "Extension Packs", "Formatters",
+    "Keymaps", "Language Packs", "Linters", "Machine Learning", "Notebooks", "Other",
+    "Programming Languages", "SCM Providers", "Snippets", "Testing", "Themes", "Visualization",
+]
+
+
+def result_total(result):
+    # El total exacto viene en resultMetadata -> ResultCount -> TotalCount
+    for metadata in result.get("resultMetadata", []):
+        if metadata.get("metadataType") == "ResultCount":
+            for item in metadata.get("metadataItems", []):
+                if item.get("name") == "TotalCount":
+                    return item.get("count")
+    return None
+
+
+def extension_id(ext):
+    return ext.get("extensionId") or f"{ext.get('publisher', {}).get('publisherName')}.{ext.get('extensionName')}"
+
+
+class MarketplaceCrawler:
+    def __init__(self, send=None, enricher=None, page_size=100, flags=870, sort_by=4):
+        self.send = send or HttpTransport().request
+        self.enricher = enricher or ConcurrentEnricher()
+        self.page_size = page_size
+        self.flags = flags
+        self.sort_by = sort_by
+
+    def query_page(self, criteria, page_number):
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json;api-version=3.0-preview.1"
+        }
+        payload = {
+            "filters": [{
+                "criteria": criteria,
+                "pageNumber": page_number,
+                "pageSize": self.page_size,
+                "sortBy": self.sort_by,
+                "sortOrder": 0
+            }],
+            "flags": self.flags
+        }
+        with self.enricher.host_limiter.limit(EXTENSION_QUERY_URL):
+            response = self.send("POST", EXTENSION_QUERY_URL, headers=headers, json=payload)
+        if response.status_code != 200:
+            print(f"Error en la solicitud: {response.status_code} - {response.text}")
+            return [], None
+        result = (response.json().get("results") or [{}])[0]
+        return result.get("extensions", []), result_total(result)
+
+    def shard_criteria(self, category=None):
+        criteria = list(VSCODE_CRITERIA)
+        if category is not None:
+            criteria.append({"filterType": 5, "value": category})
+        return criteria
+
+    def iter_pages(self, shards, max_results=None):
+        # Entrega pares (índice de la partición, extensiones de una página)
+        # Primera página de cada partición en paralelo: da el total exacto de cada una
+        first_pages = self.enricher.map(lambda criteria: self.query_page(criteria, 1), shards, desc=None)
+
+        remaining = []
+        for index, (criteria, first_page) in enumerate(zip(shards, first_pages)):
+            extensions, total = first_page or ([], None)
+            yield index, extensions
+            if total is None:
+                # Sin total no se puede planificar: se sigue página a página hasta una vacía
+                page_number, count = 2, len(extensions)
+                while extensions and (max_results is None or count < max_results):
+                    extensions, _ = self.query_page(criteria, page_number)
+                    yield index, extensions
+                    page_number += 1
+                    count += len(extensions)
+                continue
+            if max_results is not None:
+                total = min(total, max_results)
+            remaining.extend((index, criteria, page_number) for page_number in range(2, math.ceil(total / self.page_size) + 1))
+
+        # El resto de las páginas de todas las particiones se piden en paralelo, en orden
+        for (index, _, _), page in self.enricher.imap(lambda task: self.query_page(*task[1:]), remaining):
+            yield index, page[0] if page else []
+
+    def crawl(self, categories=None, max_results=None, seen=None):
+        # Sin categorías se hace una sola consulta ordenada (p. ej. las N más instaladas)
+        shards = [self.shard_criteria(category) for category in categories] if categories else [self.shard_criteria()]
+        seen = set() if seen is None else seen
+        count = 0
+        for _, extensions in self.iter_pages(shards, max_results=max_results):
+            for ext in extensions:
+                # Una extensión puede aparecer en varias categorías: se deduplica por id
+                key = extension_id(ext)
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield ext
+                count += 1
+                if max_results is not None and count >= max_results:
+                    return
+
+    def catalog_total(self):
+        return self.query_page(self.shard_criteria(), 1)[1]
+
+    def crawl_catalog(self, categories=CATEGORIES):
+        total = self.catalog_total()
+        seen = set()
+        yield from self.crawl(categories=categories, seen=seen)
+        if total is not None and len(seen) < total:
+            # Las extensiones sin categoría, o con una que no está en la lista, no caen en ninguna partición:
+            # se recorre el catálogo sin partir y solo se entregan las que faltan
+            print(f"Se obtuvieron {len(seen)} de {total} extensiones por categorías; se recorre el catálogo completo sin partir")
+            yield from self.crawl(seen=seen)
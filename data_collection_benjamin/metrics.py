@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+# Límites (en segundos) de los buckets del histograma de latencia, como en Prometheus
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PROMETHEUS_PREFIX = "vscode_extractor"
+
+
+def endpoint_name(url):
+    # Agrupa URLs por endpoint: sin owner/repo ni publisher concretos
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if host.endswith(".gallerycdn.vsassets.io") or host.endswith(".vo.msecnd.net"):
+        return f"*.{host.split('.', 1)[1]}/{segments[-1] if segments else ''}"
+    if "publishers" in segments and "vsextensions" in segments:
+        # .../publishers/{publisher}/vsextensions/{extension}/{version}/vspackage
+        start = segments.index("publishers")
+        return "/".join([host] + segments[:start] + ["publishers", "{publisher}", "vsextensions", "{extension}",
+                                                     "{version}"] + segments[start + 5:])
+    if host == "api.github.com" and segments[:1] == ["repos"] and len(segments) >= 3:
+        return "/".join([host, "repos", "{owner}", "{repo}"] + segments[3:])
+    return "/".join([host] + segments)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    def __init__(self, rate_limit_interval=1.0):
+        self.rate_limit_interval = rate_limit_interval
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        # Cada ejecución empieza con contadores nuevos; los objetos que la comparten siguen siendo los mismos
+        with self._lock:
+            self.started_at = time.time()
+            self.stages = {}
+            self.endpoints = {}
+            self.events = Counter()
+            self.rate_limit = []
+            self._last_rate_sample = {}
+
+    def track_stage(self, name, records):
+        # Mide el tiempo dentro de next(); el de las etapas anidadas se descuenta del propio
+        stage = self._stage(name)
+        stack = self._stack()
+        iterator = iter(records)
+        while True:
+            stack.append(name)
+            start = time.perf_counter()
+            try:
+                record = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - start
+                stack.pop()
+                stage["seconds"] += elapsed
+                if stack:
+                    self.stages[stack[-1]]["nested_seconds"] += elapsed
+            stage["records"] += 1
+            yield record
+
+    def add_write_time(self, name, seconds):
+        self._stage(name)["write_seconds"] += seconds
+
+    def observe_stage(self, name, seconds, records=1):
+        # Para etapas medidas por fuera de track_stage, como los trabajos de CodeQL
+        with self._lock:
+            stage = self._stage(name)
+            stage["records"] += records
+            stage["seconds"] += seconds
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {"records": 0, "seconds": 0.0, "nested_seconds": 0.0, "write_seconds": 0.0})
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def observe_request(self, url, status_code, seconds, bytes_received, retries=0):
+        with self._lock:
+            endpoint = self.endpoints.setdefault(endpoint_name(url), {
+                "requests": 0, "status": Counter(), "bytes": 0, "retries": 0, "seconds_sum": 0.0,
+                "seconds_max": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+            })
+            endpoint["requests"] += 1
+            endpoint["status"][str(status_code)] += 1
+            endpoint["bytes"] += bytes_received
+            endpoint["retries"] += retries
+            endpoint["seconds_sum"] += seconds
+            endpoint["seconds_max"] = max(endpoint["seconds_max"], seconds)
+            index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+            endpoint["buckets"][index] += 1
+
+    def observe_rate_limit(self, token_index, remaining, reset, resource="core"):
+        # Una muestra por token, presupuesto e intervalo para que la serie no crezca con cada solicitud
+        now = time.time()
+        with self._lock:
+            if now - self._last_rate_sample.get((token_index, resource), 0) < self.rate_limit_interval:
+                return
+            self._last_rate_sample[(token_index, resource)] = now
+            self.rate_limit.append({"time": round(now, 3), "token": token_index, "resource": resource,
+                                    "remaining": remaining, "reset": reset})
+
+    def count(self, event, value=1):
+        with self._lock:
+            self.events[event] += value
+
+    def report(self):
+        finished_at = time.time()
+        stages = {
+            name: {
+                "records": stage["records"],
+                "seconds": round(stage["seconds"], 3),
+                "self_seconds": round(stage["seconds"] - stage["nested_seconds"], 3),
+                "write_seconds": round(stage["write_seconds"], 3),
+            }
+            for name, stage in self.stages.items()
+        }
+        endpoints = {}
+        for name, endpoint in self.endpoints.items():
+            cumulative, histogram = 0, {}
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), endpoint["buckets"]):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            endpoints[name] = {
+                "requests": endpoint["requests"],
+                "status": dict(endpoint["status"]),
+                "bytes": endpoint["bytes"],
+                "retries": endpoint["retries"],
+                "mean_seconds": round(endpoint["seconds_sum"] / endpoint["requests"], 4),
+                "max_seconds": round(endpoint["seconds_max"], 4),
+                "latency_histogram": histogram,
+            }
+        return {
+            "started_at": self.started_at,
+            "finished_at": finished_at,
+            "seconds": round(finished_at - self.started_at, 3),
+            "stages": stages,
+            "endpoints": endpoints,
+            "events": dict(self.events),
+            "rate_limit": self.rate_limit,
+        }
+
+    def prometheus(self, report=None):
+        report = report or self.report()
+        p = PROMETHEUS_PREFIX
+        lines = [f"# TYPE {p}_run_seconds gauge", f"{p}_run_seconds {report['seconds']}"]
+        for metric, key in (("stage_seconds", "seconds"), ("stage_self_seconds", "self_seconds"),
+                            ("stage_write_seconds", "write_seconds"), ("stage_records", "records")):
+            lines.append(f"# TYPE {p}_{metric} gauge")
+            lines.extend(f'{p}_{metric}{{stage="{_escape(name)}"}} {stage[key]}' for name, stage in report["stages"].items())
+
+        lines.append(f"# TYPE {p}_http_request_duration_seconds histogram")
+        for name, endpoint in report["endpoints"].items():
+            label = f'endpoint="{_escape(name)}"'
+            for bound, count in endpoint["latency_histogram"].items():
+                lines.append(f'{p}_http_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f"{p}_http_request_duration_seconds_sum{{{label}}} {self.endpoints[name]['seconds_sum']:.6f}")
+            lines.append(f"{p}_http_request_duration_seconds_count{{{label}}} {endpoint['requests']}")
+        lines.append(f"# TYPE {p}_http_responses_total counter")
+        for name, endpoint in report["endpoints"].items():
+            lines.extend(f'{p}_http_responses_total{{endpoint="{_escape(name)}",status="{status}"}} {count}'
+                         for status, count in endpoint["status"].items())
+        for metric, key in (("http_response_bytes_total", "bytes"), ("http_retries_total", "retries")):
+            lines.append(f"# TYPE {p}_{metric} counter")
+            lines.extend(f'{p}_{metric}{{endpoint="{_escape(name)}"}} {endpoint[key]}'
+                         for name, endpoint in report["endpoints"].items())
+
+        latest = {(sample["token"], sample.get("resource", "core")): sample for sample in report["rate_limit"]}
+        lines.append(f"# TYPE {p}_rate_limit_remaining gauge")
+        lines.extend(f'{p}_rate_limit_remaining{{token="{token}",resource="{resource}"}} {sample["remaining"]}'
+                     for (token, resource), sample in latest.items())
+        lines.append(f"# TYPE {p}_events_total counter")
+        lines.extend(f'{p}_events_total{{event="{_escape(event)}"}} {count}' for event, count in report["events"].items())
+        return "\n".join(lines) + "\n"
+
+    def export(self, report_path, prometheus_path, extra=None):
+        # extra: claves propias de cada herramienta que se agregan al JSON, no a Prometheus
+        report = self.report()
+        prometheus = self.prometheus(report)
+        report.update(extra or {})
+        for path, content in ((report_path, json.dumps(report, indent=4)), (prometheus_path, prometheus)):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as output_file:
+                output_file.write(content)
+            os.replace(tmp_path, path)
+        print(f"Reporte de la ejecución guardado en: {report_path}, {prometheus_path}")
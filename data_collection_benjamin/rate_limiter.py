@@ -0,0 +1,126 @@
+import threading
+import time
+from urllib.parse import urlparse
+from http_transport import HttpTransport
+
+
+def rate_limit_resource(url):
+    # GitHub lleva presupuestos separados por recurso para un mismo token (X-RateLimit-Resource)
+    path = urlparse(url).path.rstrip("/")
+    if path.endswith("/graphql"):
+        return "graphql"
+    if path.startswith("/search/"):
+        return "search"
+    return "core"
+
+
+class TokenPool:
+    def __init__(self, tokens, pace_below=100, secondary_wait=60, transport=None):
+        if isinstance(tokens, str) or tokens is None:
+            tokens = [tokens]
+        # None permite solicitudes sin autenticación cuando no hay tokens
+        self.tokens = [token for token in tokens if token] or [None]
+        self.pace_below = pace_below
+        self.secondary_wait = secondary_wait
+        self.transport = transport or HttpTransport()
+        self._lock = threading.Lock()
+        self._next = 0
+        self._state = {}
+
+    def _get_state(self, index, resource):
+        # Se llama con el lock tomado; un estado por (token, recurso)
+        key = (index, resource)
+        if key not in self._state:
+            self._state[key] = {"remaining": None, "reset": 0.0, "blocked_until": 0.0, "next_allowed": 0.0}
+        return self._state[key]
+
+    def acquire(self, resource="core"):
+        while True:
+            with self._lock:
+                now = time.time()
+                for offset in range(len(self.tokens)):
+                    index = (self._next + offset) % len(self.tokens)
+                    state = self._get_state(index, resource)
+                    if state["reset"] <= now:
+                        state["remaining"] = None
+                    if state["blocked_until"] > now or state["next_allowed"] > now:
+                        continue
+                    if state["remaining"] is not None and state["remaining"] <= 0:
+                        continue
+                    if state["remaining"] is not None:
+                        # Reservar una solicitud y repartir el presupuesto restante hasta el reinicio
+                        state["remaining"] -= 1
+                        if state["remaining"] < self.pace_below:
+                            state["next_allowed"] = now + (state["reset"] - now) / max(state["remaining"], 1)
+                    self._next = index + 1
+                    return index
+                wait = min(self._available_at(self._get_state(index, resource)) for index in range(len(self.tokens))) - now
+            if wait > 5:
+                print(f"Límite de solicitudes alcanzado en todos los tokens. Esperando {wait:.0f} s...")
+            time.sleep(max(wait, 0.05))
+
+    def _available_at(self, state):
+        available_at = max(state["blocked_until"], state["next_allowed"])
+        if state["remaining"] is not None and state["remaining"] <= 0:
+            available_at = max(available_at, state["reset"])
+        return available_at
+
+    def update(self, index, response, resource="core"):
+        headers = response.headers
+        graphql_limited = resource == "graphql" and self.is_graphql_rate_limited(response)
+        with self._lock:
+            state = self._get_state(index, resource)
+            if "X-RateLimit-Remaining" in headers:
+                state["remaining"] = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                state["reset"] = float(headers["X-RateLimit-Reset"])
+            if graphql_limited:
+                # RATE_LIMITED dentro de un 200: el presupuesto de puntos GraphQL está agotado hasta el reinicio
+                state["remaining"] = 0
+                if state["reset"] <= time.time():
+                    state["reset"] = time.time() + self.secondary_wait
+            if self.transport.metrics is not None and state["remaining"] is not None:
+                self.transport.metrics.observe_rate_limit(index, state["remaining"], state["reset"], resource)
+            if "Retry-After" in headers:
+                state["blocked_until"] = time.time() + int(headers["Retry-After"])
+            elif not graphql_limited and self.is_rate_limited(response) and headers.get("X-RateLimit-Remaining") != "0":
+                # Límite secundario sin Retry-After: GitHub recomienda esperar al menos un minuto
+                state["blocked_until"] = time.time() + self.secondary_wait
+
+    def is_graphql_rate_limited(self, response):
+        if response.status_code != 200:
+            return False
+        try:
+            data = response.json()
+        except ValueError:
+            return False
+        return isinstance(data, dict) and any(error.get("type") == "RATE_LIMITED" for error in data.get("errors") or [])
+
+    def is_rate_limited(self, response, resource="core"):
+        if response.status_code == 429:
+            return True
+        if response.status_code == 200:
+            return resource == "graphql" and self.is_graphql_rate_limited(response)
+        if response.status_code != 403:
+            return False
+        return (
+            response.headers.get("X-RateLimit-Remaining") == "0"
+            or "Retry-After" in response.headers
+            or "secondary rate limit" in response.text.lower()
+        )
+
+    def request(self, method, url, headers=None, **kwargs):
+        resource = rate_limit_resource(url)
+        while True:
+            index = self.acquire(resource)
+            request_headers = dict(headers or {})
+            if self.tokens[index]:
+                request_headers["Authorization"] = f"Bearer {self.tokens[index]}"
+            response = self.transport.request(method, url, headers=request_headers, **kwargs)
+            self.update(index, response, resource)
+            if not self.is_rate_limited(response, resource):
+                return response
+            if self.transport.metrics is not None:
+                self.transport.metrics.count("rate_limited")
+            # La solicitud queda en espera hasta que algún token tenga presupuesto
+            print(f"Límite de solicitudes alcanzado para {url}. Reintentando con otro token o tras el reinicio.")
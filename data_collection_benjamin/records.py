@@ -0,0 +1,169 @@
+# Registros compactos con __slots__: ocupan mucho menos que el dict crudo de la API
+# y se construyen con una sola pasada por statistics, properties y files
+
+STATISTICS = {
+    "install": "install_count",
+    "averagerating": "average_rating",
+    "ratingcount": "rating_count",
+    "updateCount": "update_count",
+    "trendingdaily": "trending_daily",
+    "trendingweekly": "trending_weekly",
+    "trendingmonthly": "trending_monthly",
+    "trendingOverall": "trending_overall",
+}
+
+ASSETS = {
+    "Microsoft.VisualStudio.Code.Manifest": "manifest_url",
+    "Microsoft.VisualStudio.Services.VSIXPackage": "vsix_url",
+}
+
+
+class ExtensionRecord:
+    __slots__ = (
+        "extension_id", "publisher_name", "ext_name", "display_name", "description", "last_updated", "version",
+        "install_count", "average_rating", "rating_count", "update_count", "trending_daily", "trending_weekly",
+        "trending_monthly", "trending_overall", "repository_url", "manifest_url", "vsix_url", "icon_url",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name, "N/A"))
+
+    @classmethod
+    def from_api(cls, ext):
+        version = (ext.get("versions") or [{}])[0]
+        record = cls(
+            extension_id=ext.get("extensionId", "N/A"),
+            publisher_name=ext.get("publisher", {}).get("publisherName", "N/A"),
+            ext_name=ext.get("extensionName", "N/A"),
+            display_name=ext.get("displayName", "N/A"),
+            description=ext.get("shortDescription", "N/A"),
+            last_updated=ext.get("lastUpdated", "N/A"),
+            version=version.get("version", "N/A"),
+        )
+        for attribute in STATISTICS.values():
+            setattr(record, attribute, 0)
+        for stat in ext.get("statistics", []):
+            attribute = STATISTICS.get(stat.get("statisticName"))
+            if attribute:
+                setattr(record, attribute, stat.get("value", 0))
+        for prop in version.get("properties", []):
+            if prop.get("key", "").lower() == "repositoryuri":
+                record.repository_url = prop.get("value", "N/A")
+                break
+        files = version.get("files", [])
+        if files:
+            record.icon_url = files[0].get("source", "N/A")
+        for file in files:
+            attribute = ASSETS.get(file.get("assetType"))
+            if attribute:
+                setattr(record, attribute, file.get("source", "N/A"))
+        return record
+
+    @property
+    def full_name(self):
+        return f"{self.publisher_name}.{self.ext_name}"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RepoRecord:
+    __slots__ = (
+        "id", "name", "isFork", "commits", "branches", "releases", "forks", "mainLanguage", "defaultBranch",
+        "license", "homepage", "watchers", "stargazers", "contributors", "size", "createdAt", "pushedAt",
+        "updatedAt", "totalIssues", "openIssues", "totalPullRequests", "openPullRequests", "blankLines",
+        "codeLines", "commentLines", "metrics", "lastCommit", "lastCommitSHA", "hasWiki", "isArchived",
+        "isDisabled", "isLocked", "languages", "labels", "topics",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_graphql(cls, owner, repo, repo_data, code_metrics):
+        default_branch = repo_data.get("defaultBranchRef") or {}
+        head_commit = default_branch.get("target") or {}
+        return cls(
+            id=repo_data.get("databaseId", "N/A"),
+            name=repo_data.get("name", "N/A"),
+            isFork=repo_data.get("isFork", False),
+            commits=(head_commit.get("history") or {}).get("totalCount", 0),
+            branches=repo_data["refs"]["totalCount"],
+            releases=repo_data["releases"]["totalCount"],
+            forks=repo_data.get("forkCount", 0),
+            mainLanguage=(repo_data.get("primaryLanguage") or {}).get("name", "N/A"),
+            defaultBranch=default_branch.get("name", "N/A"),
+            license=(repo_data.get("licenseInfo") or {}).get("name", "N/A"),
+            homepage=repo_data.get("homepageUrl", "N/A"),
+            watchers=repo_data["watchers"]["totalCount"],
+            stargazers=repo_data.get("stargazerCount", 0),
+            contributors=f"https://api.github.com/repos/{owner}/{repo}/contributors",
+            size=repo_data.get("diskUsage", 0),
+            createdAt=repo_data.get("createdAt", "N/A"),
+            pushedAt=repo_data.get("pushedAt", "N/A"),
+            updatedAt=repo_data.get("updatedAt", "N/A"),
+            totalIssues=repo_data["issues"]["totalCount"],
+            openIssues=repo_data["openIssues"]["totalCount"],
+            totalPullRequests=repo_data["pullRequests"]["totalCount"],
+            openPullRequests=repo_data["openPullRequests"]["totalCount"],
+            blankLines=code_metrics.get("blankLines", 0),
+            codeLines=code_metrics.get("codeLines", 0),
+            commentLines=code_metrics.get("commentLines", 0),
+            metrics=code_metrics.get("metrics", ""),
+            lastCommit=head_commit.get("message", ""),
+            lastCommitSHA=head_commit.get("oid", ""),
+            hasWiki=repo_data.get("hasWikiEnabled", False),
+            isArchived=repo_data.get("isArchived", False),
+            isDisabled=repo_data.get("isDisabled", False),
+            isLocked=repo_data.get("isLocked", False),
+            languages=", ".join(f"{edge['node']['name']}: {edge['size']}" for edge in repo_data["languages"]["edges"]),
+            labels=repo_data["labels"]["totalCount"],
+            topics=", ".join(node["topic"]["name"] for node in repo_data["repositoryTopics"]["nodes"]),
+        )
+
+    @classmethod
+    def from_rest(cls, repo_data, last_commit_data, code_metrics):
+        # El endpoint REST no trae estos conteos: quedan en None en lugar de las URLs de la API,
+        # para que una columna tenga el mismo tipo con ambos backends y con el respaldo REST de GraphQL
+        return cls(
+            id=repo_data.get("id", "N/A"),
+            name=repo_data.get("name", "N/A"),
+            isFork=repo_data.get("fork", False),
+            commits=None,
+            branches=None,
+            releases=None,
+            forks=repo_data.get("forks_count", 0),
+            mainLanguage=repo_data.get("language", "N/A"),
+            defaultBranch=repo_data.get("default_branch", "N/A"),
+            license=(repo_data.get("license") or {}).get("name", "N/A"),
+            homepage=repo_data.get("homepage", "N/A"),
+            watchers=repo_data.get("watchers_count", 0),
+            stargazers=repo_data.get("stargazers_count", 0),
+            contributors=repo_data.get("contributors_url", ""),
+            size=repo_data.get("size", 0),
+            createdAt=repo_data.get("created_at", "N/A"),
+            pushedAt=repo_data.get("pushed_at", "N/A"),
+            updatedAt=repo_data.get("updated_at", "N/A"),
+            totalIssues=repo_data.get("open_issues_count", 0),
+            openIssues=repo_data.get("open_issues_count", 0),
+            totalPullRequests=None,
+            openPullRequests=None,
+            blankLines=code_metrics.get("blankLines", 0),
+            codeLines=code_metrics.get("codeLines", 0),
+            commentLines=code_metrics.get("commentLines", 0),
+            metrics=code_metrics.get("metrics", ""),
+            lastCommit=last_commit_data.get("lastCommit", ""),
+            lastCommitSHA=last_commit_data.get("lastCommitSHA", ""),
+            hasWiki=repo_data.get("has_wiki", False),
+            isArchived=repo_data.get("archived", False),
+            isDisabled=repo_data.get("disabled", False),
+            isLocked=repo_data.get("locked", False),
+            languages=repo_data.get("languages_url", ""),
+            labels=None,
+            topics=", ".join(repo_data.get("topics", [])),
+        )
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent_enricher import ConcurrentEnricher
+
+MANIFEST_PATH = "extension/package.json"
+NATIVE_SUFFIXES = (".node", ".dll", ".so", ".dylib", ".exe")
+
+
+def is_native_binary(name):
+    lower_name = name.lower()
+    return lower_name.endswith(NATIVE_SUFFIXES) or ".so." in os.path.basename(lower_name)
+
+
+def analyze_vsix(path):
+    # Solo se lee el directorio central del zip; del contenido se descomprime únicamente package.json
+    try:
+        with zipfile.ZipFile(path) as archive:
+            entries = [info for info in archive.infolist() if not info.is_dir()]
+            try:
+                manifest = json.loads(archive.read(MANIFEST_PATH).decode("utf-8-sig"))
+            except (KeyError, ValueError):
+                manifest = {}
+    except (OSError, zipfile.BadZipFile) as e:
+        return {"vsix_error": str(e)}
+
+    names = [info.filename for info in entries]
+    native_binaries = [name for name in names if is_native_binary(name)]
+    return {
+        "vsix_size": os.path.getsize(path),
+        "unpacked_size": sum(info.file_size for info in entries),
+        "file_count": len(entries),
+        "js_file_count": sum(name.endswith((".js", ".cjs", ".mjs")) for name in names),
+        "node_modules_file_count": sum("/node_modules/" in name for name in names),
+        "has_native_binaries": bool(native_binaries),
+        "native_binaries": ", ".join(native_binaries) if native_binaries else "N/A",
+        "main": manifest.get("main", "N/A"),
+        "engine": manifest.get("engines", {}).get("vscode", "N/A"),
+        "activation_events": ", ".join(manifest.get("activationEvents", [])) or "N/A",
+        "contributes": ", ".join(sorted(manifest.get("contributes", {}))) or "N/A",
+        "dependencies": ", ".join(sorted(manifest.get("dependencies", {}))) or "N/A",
+        "dependency_count": len(manifest.get("dependencies", {})),
+        "dev_dependency_count": len(manifest.get("devDependencies", {})),
+    }
+
+
+class VsixCache:
+    def __init__(self, cache_dir, send, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.send = send
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Paquetes entregados que todavía se están analizando: no se pueden eliminar
+        self._pinned = Counter()
+        self._downloads = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(
+            os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir) if name.endswith(".vsix")
+        )
+
+    def get(self, url, name):
+        # Un paquete publicado no cambia: el nombre incluye la versión y basta con descargarlo una vez
+        path = os.path.join(self.cache_dir, f"{name}.vsix")
+        # Un lock por paquete: dos hilos que piden el mismo nombre no lo descargan ni lo suman dos veces
+        with self._lock:
+            download_lock = self._downloads.setdefault(path, [threading.Lock(), 0])
+            download_lock[1] += 1
+        try:
+            with download_lock[0]:
+                with self._lock:
+                    if os.path.exists(path):
+                        os.utime(path)
+                        self._pinned[path] += 1
+                        return path
+                return self._download(url, path)
+        finally:
+            with self._lock:
+                download_lock[1] -= 1
+                if not download_lock[1]:
+                    del self._downloads[path]
+
+    def _download(self, url, path):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        response = self.send("GET", url, stream=True)
+        try:
+            if response.status_code != 200:
+                print(f"Error al descargar el paquete {url}: {response.status_code}")
+                return None
+            with open(tmp_path, "wb") as vsix_file:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    vsix_file.write(chunk)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            # Una respuesta en streaming mantiene la conexión hasta cerrarla, también si no era 200
+            response.close()
+
+        with self._lock:
+            os.replace(tmp_path, path)
+            self._total_bytes += os.path.getsize(path)
+            self._pinned[path] += 1
+            self._evict()
+        return path
+
+    def release(self, path):
+        with self._lock:
+            self._pinned[path] -= 1
+            if self._pinned[path] <= 0:
+                del self._pinned[path]
+            self._evict()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_path = os.path.join(self.cache_dir, name)
+            if name.endswith(".vsix") and entry_path not in self._pinned:
+                stat = os.stat(entry_path)
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+        # Se eliminan primero los paquetes usados hace más tiempo
+        for _, size, entry_path in sorted(entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+
+class VsixAnalyzer:
+    def __init__(self, cache, enricher=None, max_workers=None):
+        self.cache = cache
+        self.enricher = enricher or ConcurrentEnricher()
+        self.max_workers = max_workers
+
+    def _download(self, ext):
+        url = ext.get("vsix_url", "N/A")
+        if url == "N/A":
+            return None
+        name = f"{ext['publisher_name']}.{ext['ext_name']}-{ext.get('version', 'N/A')}"
+        with self.enricher.host_limiter.limit(url):
+            return self.cache.get(url, name)
+
+    def iter_package_metrics(self, extensions, window=64):
+        # Descargas en hilos y análisis en procesos; los resultados salen en el orden de entrada
+        in_flight = deque()
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            for ext, path in self.enricher.imap(self._download, extensions):
+                in_flight.append((ext, path, executor.submit(analyze_vsix, path) if path else None))
+                if len(in_flight) >= window:
+                    yield self._record(*in_flight.popleft())
+            while in_flight:
+                yield self._record(*in_flight.popleft())
+
+    def _record(self, ext, path, future):
+        record = {
+            "publisher_name": ext["publisher_name"],
+            "ext_name": ext["ext_name"],
+            "version": ext.get("version", "N/A"),
+        }
+        if future is None:
+            record["vsix_error"] = "Paquete no disponible"
+            return record
+        try:
+            record.update(future.result())
+        finally:
+            self.cache.release(path)
+        return record
@@ -0,0 +1,202 @@
+import csv
+import json
+import os
+import shutil
+from datetime import datetime
+from itertools import islice
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él no se genera Parquet
+    pa = None
+
+INTEGER_COLUMNS = {
+    "install_count", "rating_count", "downloads", "update_count", "id", "forks", "watchers", "stargazers",
+    "size", "totalIssues", "openIssues", "totalPullRequests", "openPullRequests", "commits", "branches",
+    "releases", "labels", "blankLines", "codeLines", "commentLines", "vsix_size", "unpacked_size", "file_count",
+    "js_file_count", "node_modules_file_count", "dependency_count", "dev_dependency_count",
+}
+FLOAT_COLUMNS = {
+    "average_rating", "trending_daily", "trending_weekly", "trending_monthly", "trending_overall",
+}
+BOOLEAN_COLUMNS = {"isFork", "hasWiki", "isArchived", "isDisabled", "isLocked", "has_native_binaries"}
+TIMESTAMP_COLUMNS = {"last_updated", "createdAt", "pushedAt", "updatedAt"}
+# Conteos que las versiones anteriores guardaban como URLs de la API con el backend REST; los registros
+# arrastrados de esas ejecuciones (modo incremental, checkpoints) hacen que la columna se escriba como texto
+COUNT_OR_URL_COLUMNS = {"commits", "branches", "releases", "labels", "totalPullRequests", "openPullRequests"}
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bool(value):
+    return value if isinstance(value, bool) else None
+
+
+def _to_timestamp(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _to_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else str(value)
+
+
+def column_type(name):
+    if name in INTEGER_COLUMNS:
+        return _to_int, pa.int64()
+    if name in FLOAT_COLUMNS:
+        return _to_float, pa.float64()
+    if name in BOOLEAN_COLUMNS:
+        return _to_bool, pa.bool_()
+    if name in TIMESTAMP_COLUMNS:
+        return _to_timestamp, pa.timestamp("ms", tz="UTC")
+    return _to_string, pa.string()
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+
+class JsonArrayWriter(JsonlWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self.count = 0
+        self.file.write("[")
+
+    def write(self, record):
+        separator = "," if self.count else ""
+        self.file.write(separator + "\n    " + json.dumps(record, ensure_ascii=False, indent=4).replace("\n", "\n    "))
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n]" if self.count else "]")
+        super().close()
+
+
+class CsvWriter:
+    # Las columnas nuevas se agregan al final del encabezado; las filas anteriores
+    # simplemente no tienen esos campos, así que no hace falta reescribirlas
+    def __init__(self, path):
+        self.path = path
+        self.body_path = f"{path}.body.tmp"
+        self.file = open(self.body_path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.fieldnames = []
+        self._known = set()
+
+    def write(self, record):
+        for key in record:
+            if key not in self._known:
+                self._known.add(key)
+                self.fieldnames.append(key)
+        self.writer.writerow([record.get(field, "") for field in self.fieldnames])
+
+    def close(self):
+        self.file.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as output_file:
+            csv.writer(output_file).writerow(self.fieldnames)
+            with open(self.body_path, "r", newline="", encoding="utf-8") as body_file:
+                shutil.copyfileobj(body_file, output_file)
+        os.remove(self.body_path)
+        os.replace(tmp_path, self.path)
+
+
+class ParquetWriter:
+    # Las filas se guardan en un JSONL temporal y el Parquet se escribe al cerrar: el esquema sale de
+    # todas las filas, incluidas las columnas que aparecen tarde y los conteos que resultan ser URLs
+    def __init__(self, path, chunk_size=10000):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.rows_path = f"{path}.rows.tmp"
+        self.chunk_size = chunk_size
+        self.file = open(self.rows_path, "w", encoding="utf-8")
+        self.names = {}
+        self.string_columns = set()
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        for name, value in record.items():
+            self.names.setdefault(name, None)
+            if name in COUNT_OR_URL_COLUMNS and isinstance(value, str):
+                self.string_columns.add(name)
+
+    def _schema(self):
+        return pa.schema([
+            pa.field(name, pa.string() if name in self.string_columns else column_type(name)[1]) for name in self.names
+        ])
+
+    def close(self):
+        self.file.close()
+        if not self.names:
+            pq.write_table(pa.table({}), self.tmp_path)
+        else:
+            schema = self._schema()
+            converters = [_to_string if field.type == pa.string() else column_type(field.name)[0] for field in schema]
+            # Cada bloque de filas es un row group y se libera al escribirlo
+            with pq.ParquetWriter(self.tmp_path, schema) as writer, open(self.rows_path, "r", encoding="utf-8") as rows_file:
+                while True:
+                    rows = [json.loads(line) for line in islice(rows_file, self.chunk_size)]
+                    if not rows:
+                        break
+                    arrays = [
+                        pa.array([convert(row.get(field.name)) for row in rows], type=field.type)
+                        for field, convert in zip(schema, converters)
+                    ]
+                    writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        os.remove(self.rows_path)
+        os.replace(self.tmp_path, self.path)
+
+
+WRITERS = {
+    ".jsonl": JsonlWriter,
+    ".json": JsonArrayWriter,
+    ".csv": CsvWriter,
+    ".parquet": ParquetWriter,
+}
+
+
+class StageWriter:
+    def __init__(self, paths):
+        self.writers = []
+        for path in paths:
+            extension = os.path.splitext(path)[1]
+            if extension == ".parquet" and pa is None:
+                print(f"pyarrow no está instalado; se omite {path}")
+                continue
+            self.writers.append(WRITERS[extension](path))
+
+    def write(self, record):
+        for writer in self.writers:
+            writer.write(record)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
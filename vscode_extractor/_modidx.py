@@ -5,4 +5,20 @@ d = { 'settings': { 'branch': 'main',
                 'doc_host': 'https://pavt.github.io',
                 'git_url': 'https://github.com/pavt/vscode-extractor',
                 'lib_path': 'vscode_extractor'},
-  'syms': {}}
+  'syms': { 'vscode_extractor.cli': { 'vscode_extractor.cli.add_collector_arguments': ( 'cli.html#add_collector_arguments',
+                                                                                        'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.add_queue_arguments': ( 'cli.html#add_queue_arguments',
+                                                                                    'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.build_parser': ('cli.html#build_parser', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.cmd_aggregate': ('cli.html#cmd_aggregate', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.cmd_clone': ('cli.html#cmd_clone', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.cmd_codeql': ('cli.html#cmd_codeql', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.cmd_crawl': ('cli.html#cmd_crawl', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.cmd_enrich': ('cli.html#cmd_enrich', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.cmd_github': ('cli.html#cmd_github', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.cmd_run': ('cli.html#cmd_run', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.github_tokens': ('cli.html#github_tokens', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.main': ('cli.html#main', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.make_extractor': ('cli.html#make_extractor', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.max_results': ('cli.html#max_results', 'vscode_extractor/cli.py'),
+                                      'vscode_extractor.cli.use_scripts': ('cli.html#use_scripts', 'vscode_extractor/cli.py')}}}
@@ -0,0 +1,211 @@
+"""`vscode-extractor` command line"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/00_cli.ipynb.
+
+# %% auto 0
+__all__ = ['COLLECTORS_DIR', 'CODEQL_DIR', 'use_scripts', 'github_tokens', 'make_extractor', 'max_results', 'cmd_crawl',
+           'cmd_enrich', 'cmd_github', 'cmd_run', 'cmd_clone', 'cmd_codeql', 'cmd_aggregate', 'add_collector_arguments',
+           'add_queue_arguments', 'build_parser', 'main']
+
+# %% ../nbs/00_cli.ipynb 3
+import argparse
+import os
+import sys
+
+COLLECTORS_DIR = 'data_collection_benjamin'
+CODEQL_DIR = 'codeql_multi_repo'
+
+# %% ../nbs/00_cli.ipynb 4
+def use_scripts(name):
+    """
+    Make a script directory of the source checkout importable, failing with a clear message when it is not shipped.
+    """
+    # Resolved on use, so the notebook cells that define this module run without __file__
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), name)
+    if not os.path.isdir(path):
+        sys.exit(f"{path} not found: run vscode-extractor from a source checkout (pip install -e .)")
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# %% ../nbs/00_cli.ipynb 5
+def github_tokens():
+    """
+    GITHUB_TOKENS (comma separated) or GITHUB_TOKEN, read from the environment or a .env file.
+    """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
+    tokens = [token.strip() for token in os.getenv('GITHUB_TOKENS', '').split(',') if token.strip()]
+    return tokens or os.getenv('GITHUB_TOKEN')
+
+# %% ../nbs/00_cli.ipynb 6
+def make_extractor(args):
+    use_scripts(COLLECTORS_DIR)
+    from extension_metadata_extractor import ExtensionMetadataExtractor
+    return ExtensionMetadataExtractor(github_tokens(), max_workers=args.workers, github_backend=args.backend,
+                                      clones_dir=args.clones_dir, data_dir=args.data_dir)
+
+# %% ../nbs/00_cli.ipynb 7
+def max_results(args):
+    return None if args.full_catalog else args.max_results
+
+# %% ../nbs/00_cli.ipynb 8
+def cmd_crawl(args):
+    make_extractor(args).run_crawl(max_results=max_results(args))
+
+# %% ../nbs/00_cli.ipynb 9
+def cmd_enrich(args):
+    extractor = make_extractor(args)
+    extractor.run_enrich(resume=args.resume)
+    if args.vsix:
+        extractor.run_packages()
+
+# %% ../nbs/00_cli.ipynb 10
+def cmd_github(args):
+    make_extractor(args).run_github(resume=args.resume)
+
+# %% ../nbs/00_cli.ipynb 11
+def cmd_run(args):
+    extractor = make_extractor(args)
+    if not args.queue:
+        extractor.run(max_results=max_results(args), resume=args.resume, incremental=args.incremental,
+                      analyze_packages=args.vsix)
+        return
+    from job_queue import JobQueue
+    queue = JobQueue(args.queue)
+    if args.queue_role in ('seed', 'all'):
+        extractor.seed_queue(queue, max_results=max_results(args))
+    if args.queue_role in ('work', 'all'):
+        extractor.work_queue(queue, worker_id=args.worker_id, analyze_packages=args.vsix)
+    if args.queue_role in ('merge', 'all'):
+        extractor.merge_queue(queue)
+    queue.close()
+
+# %% ../nbs/00_cli.ipynb 12
+def cmd_clone(args):
+    use_scripts(CODEQL_DIR)
+    from repo_cloner import clone_repositories, load_repo_list
+    repos = load_repo_list(args.repo_list)
+    if args.num_repos:
+        repos = repos.head(args.num_repos)
+    clone_repositories(repos, args.base_dir, max_workers=args.workers, url_template=args.url_template,
+                       depth=args.depth, timeout=args.timeout, report_file=args.report)
+
+# %% ../nbs/00_cli.ipynb 13
+def cmd_codeql(args):
+    use_scripts(CODEQL_DIR)
+    from codeql_analysis import run_analysis
+    statuses = run_analysis(args.csv_file, args.base_dir, args.results_dir, num_repos=args.num_repos,
+                            max_workers=args.workers, total_threads=args.threads, total_ram_mb=args.ram_mb,
+                            timeout=args.timeout, disk_budget_gb=args.disk_budget_gb,
+                            clone_workers=args.clone_workers, url_template=args.url_template,
+                            queue_path=args.queue, queue_role=args.queue_role, worker_id=args.worker_id,
+                            multi_language=args.db_cluster)
+    if statuses:
+        counts = {}
+        for status in statuses.values():
+            counts[status] = counts.get(status, 0) + 1
+        print(', '.join(f"{status}: {count}" for status, count in sorted(counts.items())))
+
+# %% ../nbs/00_cli.ipynb 14
+def cmd_aggregate(args):
+    use_scripts(CODEQL_DIR)
+    from sarif_aggregator import aggregate_sarif, findings_per_rule
+    df = aggregate_sarif(args.results_dir, output_file=args.output, max_workers=args.workers)
+    print(f"{len(df)} findings in {df['repo'].nunique()} repositories")
+    if args.top:
+        print(findings_per_rule(df).head(args.top).to_string(index=False))
+
+# %% ../nbs/00_cli.ipynb 15
+def add_collector_arguments(parser, crawl=False):
+    parser.add_argument('--data-dir', help="Directory for the numbered stage files (default: data_collection_benjamin/data)")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent requests")
+    parser.add_argument('--backend', choices=['graphql', 'rest'], default='graphql',
+                        help="GitHub API used for repository metadata: graphql batches 40 repositories per query, but line "
+                             "counts still cost one REST stats call per repository (about 1 request per repository "
+                             "against 3 with rest) unless --clones-dir is set")
+    parser.add_argument('--clones-dir', help="Local clones (owner/repo) used to count lines instead of the GitHub stats API, "
+                                             "which leaves only the batched GraphQL queries")
+    if crawl:
+        parser.add_argument('--max-results', type=int, default=10, help="Most installed extensions to collect")
+        parser.add_argument('--full-catalog', action='store_true', help="Crawl the whole Marketplace instead")
+
+# %% ../nbs/00_cli.ipynb 16
+def add_queue_arguments(parser):
+    parser.add_argument('--queue', help="SQLite job queue shared by several nodes")
+    parser.add_argument('--queue-role', choices=['seed', 'work', 'merge', 'all'], default='all',
+                        help="seed fills the queue, work processes it, merge writes the combined outputs")
+    parser.add_argument('--worker-id', help="Worker name in the queue (default: host-pid)")
+
+# %% ../nbs/00_cli.ipynb 17
+def build_parser():
+    parser = argparse.ArgumentParser(prog='vscode-extractor',
+                                     description="Collect VS Code extension metadata and analyze their repositories.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    crawl = subparsers.add_parser('crawl', help="Stage 1: list extensions from the Marketplace")
+    add_collector_arguments(crawl, crawl=True)
+    crawl.set_defaults(func=cmd_crawl)
+
+    enrich = subparsers.add_parser('enrich', help="Stages 2-3: Marketplace metadata and manifests for the stage 1 list")
+    add_collector_arguments(enrich)
+    enrich.add_argument('--resume', action='store_true', help="Continue from the stage 2 checkpoint")
+    enrich.add_argument('--vsix', action='store_true', help="Also download and analyze the .vsix packages (stage 5)")
+    enrich.set_defaults(func=cmd_enrich)
+
+    github = subparsers.add_parser('github', help="Stage 4: GitHub metadata for the extensions with a repository")
+    add_collector_arguments(github)
+    github.add_argument('--resume', action='store_true', help="Continue from the stage 4 checkpoint")
+    github.set_defaults(func=cmd_github)
+
+    run = subparsers.add_parser('run', help="All collector stages in one streaming pass")
+    add_collector_arguments(run, crawl=True)
+    run.add_argument('--resume', action='store_true', help="Continue the last run from its checkpoints")
+    run.add_argument('--incremental', action='store_true', help="Refresh only new or updated extensions")
+    run.add_argument('--vsix', action='store_true', help="Also download and analyze the .vsix packages")
+    add_queue_arguments(run)
+    run.set_defaults(func=cmd_run)
+
+    clone = subparsers.add_parser('clone', help="Shallow-clone or update the repositories in a list")
+    clone.add_argument('repo_list', help="CSV with repo_owner/repo_name or a stage 3 .json/.jsonl file")
+    clone.add_argument('base_dir', help="Clones go to base_dir/owner/repo")
+    clone.add_argument('--num-repos', type=int)
+    clone.add_argument('--workers', type=int, default=8)
+    clone.add_argument('--url-template', help="e.g. git@github.com:{owner}/{repo}.git")
+    clone.add_argument('--depth', type=int, default=1)
+    clone.add_argument('--timeout', type=int)
+    clone.add_argument('--report', help="Write the per-repository clone status to this CSV")
+    clone.set_defaults(func=cmd_clone)
+
+    codeql = subparsers.add_parser('codeql', help="Create CodeQL databases and run the security suites")
+    codeql.add_argument('csv_file', help="CSV with repo_owner, repo_name, language and size")
+    codeql.add_argument('base_dir', help="Directory with the clones (owner/repo)")
+    codeql.add_argument('results_dir')
+    codeql.add_argument('--num-repos', type=int, default=2)
+    codeql.add_argument('--workers', type=int, default=1, help="Repositories analyzed in parallel")
+    codeql.add_argument('--threads', type=int, help="Total CodeQL threads shared by the workers")
+    codeql.add_argument('--ram-mb', type=int, help="Total CodeQL RAM in MB shared by the workers")
+    codeql.add_argument('--timeout', type=int, help="Seconds allowed for each CodeQL command")
+    codeql.add_argument('--disk-budget-gb', type=float, help="Evict least recently used databases above this size")
+    codeql.add_argument('--clone-workers', type=int, help="Clone or update the repositories first with this many workers")
+    codeql.add_argument('--url-template')
+    codeql.add_argument('--db-cluster', action='store_true',
+                        help="Detect every supported language and extract them all in one cluster database build")
+    add_queue_arguments(codeql)
+    codeql.set_defaults(func=cmd_codeql)
+
+    aggregate = subparsers.add_parser('aggregate', help="Combine the SARIF results into one findings table")
+    aggregate.add_argument('results_dir', help="Directory with the .sarif files")
+    aggregate.add_argument('--output', help="Write the findings to this .parquet or .csv file")
+    aggregate.add_argument('--workers', type=int)
+    aggregate.add_argument('--top', type=int, default=10, help="Print the most frequent rules")
+    aggregate.set_defaults(func=cmd_aggregate)
+    return parser
+
+# %% ../nbs/00_cli.ipynb 18
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)